@@ -0,0 +1,87 @@
+# 对比旧解码路径与 static.getDcmImgAndMdInfo 的打开耗时和峰值内存
+# 用法: python benchmark/decode.py [--size 3000] [--bits 12] [--repeat 3]
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# 改写前的实现,三次读取 pixel_array 并经过 float64 中间结果
+def legacyDcmImgAndMdInfo(imgDir: str):
+    import numpy
+    from labeldcm.module import static
+    from PIL import Image
+    from pydicom import dcmread
+    dcm = dcmread(imgDir)
+    low = numpy.min(dcm.pixel_array)
+    upp = numpy.max(dcm.pixel_array)
+    mat = numpy.floor_divide(dcm.pixel_array, (upp - low + 1) / 256)
+    img = Image.fromarray(mat.astype(numpy.uint8)).toqpixmap()
+    return img, static.getMdInfo(dcm)
+
+def currentDcmImgAndMdInfo(imgDir: str):
+    from labeldcm.module import static
+    return static.getDcmImgAndMdInfo(imgDir)
+
+VARIANTS = {'legacy': legacyDcmImgAndMdInfo, 'current': currentDcmImgAndMdInfo}
+
+def getRss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+
+# 在独立进程中运行,峰值内存互不影响
+def measure(name: str, imgDir: str, queue: multiprocessing.Queue):
+    from PyQt5.QtWidgets import QApplication
+    # 预先导入,模块本身占用的内存计入基线,不计入解码的峰值内存
+    from labeldcm.module import static  # noqa: F401
+    import numpy  # noqa: F401
+    import PIL.Image  # noqa: F401
+    import pydicom  # noqa: F401
+    app = QApplication([])
+    base = getRss()
+    try:
+        begin = time.perf_counter()
+        VARIANTS[name](imgDir)
+        elapsed = time.perf_counter() - begin
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        queue.put((elapsed, max(0, peak - base)))
+    except Exception as e:
+        queue.put(e)
+    del app
+
+def run(name: str, imgDir: str):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(name, imgDir, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def main():
+    from synthetic import makeDcm
+    parser = argparse.ArgumentParser(description='DICOM open latency and peak RSS')
+    parser.add_argument('--size', type=int, default=3000)
+    parser.add_argument('--bits', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        imgDir = makeDcm(os.path.join(tmp, 'bench.dcm'), args.size, args.bits)
+        frame = args.size * args.size * (1 if args.bits <= 8 else 2) / 2 ** 20
+        print(f'{args.size}x{args.size} {args.bits} bit, frame {frame:.1f} MiB')
+        for name in VARIANTS:
+            results = [run(name, imgDir) for _ in range(args.repeat)]
+            elapsed = min(r[0] for r in results)
+            peak = min(r[1] for r in results) / 1024
+            print(f'{name:>8}: open {elapsed * 1000:8.1f} ms, peak RSS +{peak:7.1f} MiB')
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
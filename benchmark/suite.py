@@ -0,0 +1,219 @@
+# 打开,绘制与交互路径的基准测试,结果写入JSON,用于比较不同提交
+# 用法: python benchmark/suite.py run [-o result.json] [--quick] [-k 名称片段]
+#       python benchmark/suite.py compare old.json new.json [--threshold 1.1]
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# 每次调用setup得到新的参数,只对func计时,返回每次的耗时(秒)
+def measure(func: Callable, setup: Callable = lambda: (), repeat: int = 5):
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        begin = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - begin)
+    return times
+
+# 在size x size的图片上随机生成count个点,约一半的点连成线,另有角度与圆
+def populate(store, count: int, size: int, seed: int = 0):
+    rng = random.Random(seed)
+    store.clear()
+    for index in range(1, count + 1):
+        store.addPoint(index, rng.uniform(10, size - 10), rng.uniform(10, size - 10), 0)
+    for index in range(1, count, 2):
+        store.addLine(index, index + 1, 0)
+    for index in range(1, count - 2, 4):
+        store.addAngle(index, index + 1, index + 2, 0)
+    for index in range(2, count - 2, 8):
+        store.addCircle(index, index + 2, 0)
+
+class Suite(object):
+    def __init__(self, tmp: str, quick: bool, keyword: str):
+        self.tmp = tmp
+        self.quick = quick
+        self.keyword = keyword
+        self.repeat = 3 if quick else 7
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, times: List[float]):
+        self.results[name] = {
+            'min': min(times), 'median': statistics.median(times), 'max': max(times), 'repeat': len(times)
+        }
+        print(f'{name:<32} min {min(times) * 1000:9.2f} ms  median {statistics.median(times) * 1000:9.2f} ms')
+
+    def isSelected(self, name: str):
+        return self.keyword in name
+
+    def benchOpen(self):
+        from labeldcm.module import static
+        from synthetic import makeDcm
+        sizes = (512, 2048) if self.quick else (512, 2048, 4096)
+        for bits in (8, 12, 16):
+            for size in sizes:
+                name = f'open/{bits}bit/{size}'
+                if not self.isSelected(name):
+                    continue
+                imgDir = makeDcm(os.path.join(self.tmp, f'{bits}_{size}.dcm'), size, bits)
+                self.add(name, measure(lambda: static.getDcmImgAndMdInfo(imgDir), repeat=self.repeat))
+
+    # 画布上显示一张2048 x 2048的合成图片,不经过后台加载
+    def getApp(self):
+        from labeldcm.module import static
+        from labeldcm.module.app import LabelApp
+        from labeldcm.module.frames import FrameBuffer
+        from synthetic import makeDcm
+        imgDir = makeDcm(os.path.join(self.tmp, 'app.dcm'), 2048)
+        app = LabelApp()
+        app.resize(1600, 900)
+        app.show()
+        img, mdInfo = static.getDcmImgAndMdInfo(imgDir)
+        app.showImg(imgDir, img, mdInfo, FrameBuffer())
+        app.autoSaver.close()
+        return app
+
+    def benchApp(self):
+        from labeldcm.module.export import drawLabels
+        from PyQt5.QtCore import QPointF
+        from PyQt5.QtGui import QPainter
+        from PyQt5.QtWidgets import QApplication, QInputDialog
+        counts = (10, 100, 1000) if self.quick else (10, 100, 1000, 5000)
+        if not any(self.isSelected(f'{case}/{count}') for count in counts
+                   for case in ('updateAll', 'getPointIndex', 'erasePoint', 'modifyIndex', 'export')):
+            return None
+        app = self.getApp()
+        size = app.src.width()
+        for count in counts:
+            populate(app.store, count, size)
+            app.updateAll()
+            QApplication.processEvents()
+            if self.isSelected(f'updateAll/{count}'):
+                # 所有点平移后全部图元都需要更新
+                def moveAll(step=[0]):
+                    step[0] = 1 - step[0]
+                    for index in list(app.store.getIndexs()):
+                        x, y = app.store.getPoint(index)
+                        app.store.movePoint(index, x + (1 if step[0] else -1), y)
+                    return ()
+                self.add(f'updateAll/{count}', measure(app.updateAll, moveAll, self.repeat))
+            if self.isSelected(f'getPointIndex/{count}'):
+                rng = random.Random(1)
+                points = [QPointF(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(1000)]
+                self.add(f'getPointIndex/{count}', measure(lambda: [app.getPointIndex(p) for p in points],
+                                                           repeat=self.repeat))
+            if self.isSelected(f'erasePoint/{count}'):
+                def erase():
+                    for index in range(1, min(count, 100) + 1):
+                        app.erasePoint(index)
+                    app.updateAll()
+                self.add(f'erasePoint/{count}', measure(erase, lambda: populate(app.store, count, size) or (),
+                                                        self.repeat))
+            if self.isSelected(f'modifyIndex/{count}'):
+                populate(app.store, count, size)
+                app.updateAll()
+                newIndexs = iter(range(count + 1, count + 10 ** 6))
+                getInt = QInputDialog.getInt
+                QInputDialog.getInt = staticmethod(lambda *args, **kwargs: (next(newIndexs), True))
+
+                def modify():
+                    for index in random.Random(2).sample(sorted(app.store.getIndexs()), min(count, 100)):
+                        app.modifyIndex(index)
+                    app.updateAll()
+                try:
+                    self.add(f'modifyIndex/{count}', measure(modify, repeat=1))
+                finally:
+                    QInputDialog.getInt = getInt
+            if self.isSelected(f'export/{count}'):
+                populate(app.store, count, size)
+
+                # 导出线程中按原图尺寸绘制标注的部分
+                def label(img):
+                    painter = QPainter()
+                    painter.begin(img)
+                    drawLabels(painter, app.store, app.ratioToSrc)
+                    painter.end()
+                self.add(f'export/{count}', measure(label, lambda: (app.src.toImage(),), self.repeat))
+        app.close()
+
+    def run(self):
+        self.benchOpen()
+        self.benchApp()
+        return self.results
+
+def getCommit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def run(args: argparse.Namespace):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([])
+    output = os.path.abspath(args.output or f'benchmark-{getCommit() or "local"}.json')
+    # LabelApp按相对路径读取样式表
+    os.chdir(root)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = Suite(tmp, args.quick, args.keyword).run()
+    del app
+    data = {
+        'commit': getCommit(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(), 'machine': platform.machine(), 'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    print(f'结果已写入 {output}')
+
+# 按最小耗时比较,新/旧超过threshold时返回1
+def compare(args: argparse.Namespace):
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f'{"":<32} {old["commit"] or "old":>12} {new["commit"] or "new":>12}   ratio')
+    isRegressed = False
+    for name in sorted(set(old['results']) & set(new['results'])):
+        before = old['results'][name]['min']
+        after = new['results'][name]['min']
+        ratio = after / before if before else float('inf')
+        mark = ''
+        if ratio > args.threshold:
+            mark = '  slower'
+            isRegressed = True
+        elif ratio < 1 / args.threshold:
+            mark = '  faster'
+        print(f'{name:<32} {before * 1000:9.2f} ms {after * 1000:9.2f} ms {ratio:7.2f}{mark}')
+    return 1 if isRegressed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='label-dcm benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+    runParser = commands.add_parser('run')
+    runParser.add_argument('-o', '--output')
+    runParser.add_argument('--quick', action='store_true', help='更小的图片与标注规模,更少的重复次数')
+    runParser.add_argument('-k', '--keyword', default='', help='只运行名称包含该片段的测试')
+    compareParser = commands.add_parser('compare')
+    compareParser.add_argument('old')
+    compareParser.add_argument('new')
+    compareParser.add_argument('--threshold', type=float, default=1.1)
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+        return 0
+    return compare(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
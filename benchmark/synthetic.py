@@ -0,0 +1,42 @@
+import numpy
+import os
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid, SecondaryCaptureImageStorage
+
+# 生成带有病人信息的合成dcm文件,frames大于1时为多帧图片
+def makeDcm(imgDir: str, size: int, bits: int = 12, seed: int = 0, frames: int = 1):
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    dcm = FileDataset(imgDir, {}, file_meta=meta, preamble=b'\0' * 128)
+    dcm.SOPClassUID = meta.MediaStorageSOPClassUID
+    dcm.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    dcm.PatientID = '000000'
+    dcm.PatientName = 'Synthetic'
+    dcm.PatientBirthDate = '19700101'
+    dcm.PatientSex = 'O'
+    dcm.PatientWeight = 60
+    dcm.StudyDate = '20200101'
+    dcm.SeriesDate = '20200101'
+    dcm.PatientAge = '050Y'
+    dcm.BodyPartExamined = 'CHEST'
+    dcm.Modality = 'DX'
+    dcm.SamplesPerPixel = 1
+    dcm.PhotometricInterpretation = 'MONOCHROME2'
+    dcm.Rows = size
+    dcm.Columns = size
+    dcm.BitsAllocated = 8 if bits <= 8 else 16
+    dcm.BitsStored = bits
+    dcm.HighBit = bits - 1
+    dcm.PixelRepresentation = 0
+    dcm.PixelSpacing = [0.1, 0.1]
+    if frames > 1:
+        dcm.NumberOfFrames = frames
+        dcm.FrameTime = 40
+    shape = (frames, size, size) if frames > 1 else (size, size)
+    mat = numpy.random.default_rng(seed).integers(0, 2 ** bits, shape, dtype=numpy.uint16)
+    dcm.PixelData = mat.astype(numpy.uint8 if bits <= 8 else numpy.uint16).tobytes()
+    os.makedirs(os.path.dirname(os.path.abspath(imgDir)), exist_ok=True)
+    dcm.save_as(imgDir, enforce_file_format=True)
+    return imgDir
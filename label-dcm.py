@@ -1,8 +1,28 @@
 if __name__ == "__main__":
+    import sys
+    # python label-dcm.py measure <root> -o <output>
+    if sys.argv[1:2] == ['measure']:
+        from labeldcm.module.batch import main
+        sys.exit(main(sys.argv[2:]))
+    import argparse
     from labeldcm.module.app import LabelApp
+    from labeldcm.module.profiler import profiler
     from PyQt5.QtWidgets import QApplication
-    import sys
-    app = QApplication(sys.argv)
+    # python label-dcm.py [--profile <output.prof>] [--trace <output.json>]
+    parser = argparse.ArgumentParser(prog='label-dcm')
+    parser.add_argument('--profile', help='退出时写入cProfile统计')
+    parser.add_argument('--trace', help='退出时写入Chrome Trace格式的各阶段耗时')
+    args, qtArgs = parser.parse_known_args()
+    if args.profile or args.trace:
+        profiler.enabled = True
+    if args.profile:
+        profiler.startProfile()
+    app = QApplication(sys.argv[:1] + qtArgs)
     labelApp = LabelApp()
     labelApp.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    if args.profile:
+        profiler.stopProfile(args.profile)
+    if args.trace:
+        profiler.dumpTrace(args.trace)
+    sys.exit(code)
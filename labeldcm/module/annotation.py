@@ -0,0 +1,128 @@
+from labeldcm.module.config import config
+from labeldcm.module.store import FrameStores, LabelStore
+import json
+import os
+from typing import List
+
+# 标注文件格式版本,格式不兼容时递增
+# 2: 多帧图片的其余帧保存在frames中
+version = 2
+
+# 图片对应的标注文件,与图片同目录同名
+def getAnnotationDir(imgDir: str):
+    return os.path.splitext(imgDir)[0] + '.json'
+
+# 标注文件之后追加的修改记录,每行一条json
+def getJournalDir(imgDir: str):
+    return os.path.splitext(imgDir)[0] + '.journal'
+
+# 图片已有标注文件或修改记录
+def hasAnnotation(imgDir: str):
+    return os.path.isfile(getAnnotationDir(imgDir)) or os.path.isfile(getJournalDir(imgDir))
+
+def getColorName(color: int):
+    return config.colorList[color]
+
+def getColorIndex(name: str):
+    return config.colorList.index(name if name in config.colorList else config.defaultColor)
+
+# 一帧的标注 -> dict,坐标为原图像素坐标
+def toFrameDict(store: LabelStore):
+    points = []
+    for index in sorted(store.getIndexs()):
+        x, y = store.getPoint(index)
+        points.append([index, x, y, getColorName(store.getPointColor(index))])
+    data = {'points': points}
+    for name, relation in zip(('lines', 'angles', 'circles'), store.getRelations()):
+        data[name] = [[*key, getColorName(relation.getColor(key))] for key in sorted(relation)]
+    data['pivots'] = sorted(store.pivots)
+    return data
+
+# dict -> 一帧的标注
+def fromFrameDict(store: LabelStore, data: dict):
+    for index, x, y, color in data.get('points', []):
+        store.addPoint(int(index), float(x), float(y), getColorIndex(color))
+    for name, relation in zip(('lines', 'angles', 'circles'), store.getRelations()):
+        for *key, color in data.get(name, []):
+            store.addRelation(relation, getColorIndex(color), *map(int, key))
+    for index in data.get('pivots', []):
+        store.addPivot(index)
+
+# 标注 -> dict,第0帧在最外层,其余有标注的帧在frames中
+def toDict(stores: FrameStores):
+    data = {'version': version, **toFrameDict(stores.stores.get(0, LabelStore()))}
+    frames = {str(frame): toFrameDict(store) for frame, store in stores if frame and len(store)}
+    if frames:
+        data['frames'] = frames
+    return data
+
+# dict -> 标注,清空stores后写入
+def fromDict(stores: FrameStores, data: dict):
+    if data.get('version', 0) > version:
+        raise ValueError(f'Unsupported annotation version {data.get("version")}!')
+    stores.clear()
+    fromFrameDict(stores.get(0), data)
+    for frame, frameData in data.get('frames', {}).items():
+        fromFrameDict(stores.get(int(frame)), frameData)
+    return stores
+
+def dumpStores(stores: FrameStores, fileDir: str):
+    writeAnnotation(toDict(stores), fileDir)
+
+def loadStores(fileDir: str, stores: FrameStores):
+    with open(fileDir, 'r', encoding='utf-8') as file:
+        return fromDict(stores, json.load(file))
+
+# 先写临时文件再替换,写到一半时不会损坏原文件
+def writeAnnotation(data: dict, fileDir: str):
+    tempDir = fileDir + '.tmp'
+    with open(tempDir, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(tempDir, fileDir)
+
+def appendJournal(ops: List[list], journalDir: str):
+    with open(journalDir, 'a', encoding='utf-8') as file:
+        file.write(''.join(json.dumps(op) + '\n' for op in ops))
+
+# 最后一行可能因退出时未写完而不完整,忽略无法解析的行之后的内容
+def readJournal(journalDir: str):
+    ops = []
+    with open(journalDir, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                break
+    return ops
+
+# 只读取标注文件,返回标注文件的代数,不存在时清空stores并返回None
+def loadSnapshot(imgDir: str, stores: FrameStores):
+    annotationDir = getAnnotationDir(imgDir)
+    stores.clear()
+    if not os.path.isfile(annotationDir):
+        return None
+    with open(annotationDir, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    fromDict(stores, data)
+    return int(data.get('generation', 0))
+
+# 修改记录的第一行为['generation', 代数],即开始记录时标注文件的代数
+# 代数不同的修改记录已经合并进标注文件(写入标注文件后,删除修改记录前中断),返回None
+# 没有代数的旧修改记录总是重放
+def getJournalOps(ops: List[list], generation: int):
+    if ops and ops[0] and ops[0][0] == 'generation':
+        return ops[1:] if ops[0][1] == generation else None
+    return ops
+
+# 读取图片的标注文件并重放未合并的修改记录,都不存在时返回False
+def loadAnnotation(imgDir: str, stores: FrameStores):
+    journalDir = getJournalDir(imgDir)
+    generation = loadSnapshot(imgDir, stores)
+    if os.path.isfile(journalDir) and (ops := getJournalOps(readJournal(journalDir), generation or 0)):
+        stores.replay(ops)
+    return generation is not None or os.path.isfile(journalDir)
+
+# 无法重放的修改记录改名保留,之后的修改写入新的修改记录
+def setJournalAside(imgDir: str):
+    journalDir = getJournalDir(imgDir)
+    os.replace(journalDir, journalDir + '.bad')
@@ -1,12 +1,27 @@
-from labeldcm.module import static
+from labeldcm.module import annotation, static
+from labeldcm.module.autosave import AutoSaver
+from labeldcm.module.catalog import openCatalog
 from labeldcm.module.config import config
+from labeldcm.module.export import ExportEngine, exportFormats, ExportTask
+from labeldcm.module.frames import FrameBuffer
+from labeldcm.module.item import AngleItem, CircleItem, getAngleStates, getCircleStates, getLineStates, LabelItem, \
+    LineItem, PointItem
+from labeldcm.module.loader import FrameLoader, HeaderLoader, ImgLoader
 from labeldcm.module.mode import LabelMode
+from labeldcm.module.profiler import profiler
+from labeldcm.module.series import ImgCache, isDcmDir, Series
+from labeldcm.module.store import FrameStores, Relation
+from labeldcm.module.tiles import TileItem
 from labeldcm.ui.form import Ui_Form
-from PyQt5.QtCore import pyqtBoundSignal, QCoreApplication, QEvent, QObject, QPointF, QRectF, QSize, Qt
-from PyQt5.QtGui import QColor, QCursor, QFont, QIcon, QMouseEvent, QPainter, QPen, QPixmap, QResizeEvent
-from PyQt5.QtWidgets import QAction, QFileDialog, QGraphicsScene, QInputDialog, \
-    QMainWindow, QMenu, QMessageBox, QStatusBar
-from typing import Dict, Optional, Set, Tuple
+import numpy
+import os
+from PyQt5.QtCore import pyqtBoundSignal, QEvent, QObject, QPoint, QPointF, QRectF, QSize, QSizeF, Qt, \
+    QThreadPool, QTimer
+from PyQt5.QtGui import QCloseEvent, QColor, QCursor, QIcon, QImage, QMouseEvent, QPixmap, QResizeEvent, QTransform
+from PyQt5.QtWidgets import QAction, QFileDialog, QGraphicsScene, QGraphicsView, QInputDialog, QLabel, QMainWindow, \
+    QMenu, QMessageBox, QProgressBar, QStatusBar
+import sqlite3
+from typing import Dict, Iterable, Optional, Set, Tuple
 
 class LabelApp(QMainWindow, Ui_Form):
     def __init__(self):
@@ -19,8 +34,9 @@ class LabelApp(QMainWindow, Ui_Form):
             self.setStyleSheet(f.read())
 
         # 初始化颜色单选框
+        self.palette = [QColor(color) for color in config.colorList]
         self.initColorBox()
-        self.color = QColor(config.defaultColor)
+        self.color = config.colorList.index(config.defaultColor)
 
         # 初始化操作单选框
         self.initActionBox()
@@ -29,12 +45,30 @@ class LabelApp(QMainWindow, Ui_Form):
         # 图片比例，初始100%
         self.imgSize = 1
 
-        # 初始化画布，原图，现图，现图/原图，原图/现图
+        # 初始化画布，原图，现图尺寸，原图/现图
         self.src: Optional[QPixmap] = None
-        self.img: Optional[QPixmap] = None
-        self.ratioFromOld = 1
+        self.img: Optional[QSize] = None
+        # 原图尺寸,与src不同时src是全分辨率图片读取完成前的预览
+        self.srcSize = QSize()
         self.ratioToSrc = 1
 
+        # 现图缓存键：原图，画布宽高，图片比例
+        self.imgKey: Optional[Tuple[int, int, int, float]] = None
+
+        # 常驻画布，图片和每个标注各对应一个图元，只更新变化的图元
+        # 画布坐标即原图坐标，缩放由imgView的变换完成
+        # 图片按块绘制,只生成可见范围内与缩放相符的层
+        self.scene = QGraphicsScene(self)
+        self.imgItem = TileItem()
+        self.scene.addItem(self.imgItem)
+        self.imgView.setScene(self.scene)
+        # 只重绘变化图元的外接矩形
+        self.imgView.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
+        self.pointItems: Dict[int, PointItem] = {}
+        self.lineItems: Dict[Tuple[int, int], LineItem] = {}
+        self.angleItems: Dict[Tuple[int, int, int], AngleItem] = {}
+        self.circleItems: Dict[Tuple[int, int], CircleItem] = {}
+
         self.targetEventType = [QMouseEvent.MouseButtonPress, QMouseEvent.MouseMove, QMouseEvent.MouseButtonRelease]
         self.initEventConnections()
 
@@ -43,20 +77,10 @@ class LabelApp(QMainWindow, Ui_Form):
         self.indexB = -1
         self.indexC = -1
 
-        # A: IndexA - A, Color
-        self.points: Dict[int, Tuple[QPointF, QColor]] = {}
-
-        # AB: IndexA, IndexB - Color
-        self.lines: Dict[Tuple[int, int], QColor] = {}
-
-        # ∠ABC: IndexA, IndexB, IndexC - Color
-        self.angles: Dict[Tuple[int, int, int], QColor] = {}
-
-        # ⊙A, r = AB: IndexA, IndexB - Color
-        self.circles: Dict[Tuple[int, int], QColor] = {}
-
-        # Init Pivots
-        self.pivots: Set[int] = set()
+        # 点(原图坐标)，线，角度，圆，关键点，颜色为palette的下标
+        # 多帧图片每帧一份标注,store为当前帧的标注
+        self.stores = FrameStores(config.pointWidth)
+        self.store = self.stores.select(0)
 
         # Init Highlight 选中的点
         self.highlightMoveIndex = -1
@@ -68,12 +92,88 @@ class LabelApp(QMainWindow, Ui_Form):
         # 状态栏
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
+        self.loadProgress = QProgressBar()
+        self.loadProgress.setMaximumWidth(200)
+        self.loadProgress.setRange(0, 100)
+        self.loadProgress.hide()
+        self.statusBar.addPermanentWidget(self.loadProgress)
+        # 打开耗时记录时在状态栏显示帧率与各阶段耗时
+        self.profileLabel = QLabel()
+        self.statusBar.addPermanentWidget(self.profileLabel)
+        self.profileTimer = QTimer(self)
+        self.profileTimer.timeout.connect(self.updateProfileInfo)
+        if profiler.enabled:
+            self.profileTimer.start(config.profileInterval)
+        else:
+            self.profileLabel.hide()
+
+        # 后台加载图片,loadDir为正在打开的图片,其余为预读
+        self.loaderPool = QThreadPool(self)
+        self.loaders: Dict[str, ImgLoader] = {}
+        self.loadDir: Optional[str] = None
+        # 正在打开的图片的病人信息,只显示在状态栏
+        self.loadHeader = ''
+        self.imgDir: Optional[str] = None
+
+        # 文件夹浏览,已解码的图片按LRU缓存
+        self.series = Series()
+        # 后台读取文件夹中dcm文件的文件头,用于文件列表的显示与搜索
+        self.headerLoader: Optional[HeaderLoader] = None
+        # 文件头与缩略图的本地索引,再次浏览时只读取有变化的文件,也可以跨文件夹搜索
+        self.catalog = openCatalog()
+        self.seriesList.setIconSize(QSize(config.thumbnailSize, config.thumbnailSize))
+        self.imgCache = ImgCache(config.cacheCapacity)
+
+        # 多帧图片按需在后台解码各帧,当前帧附近的帧缓存在frames中
+        self.frames = FrameBuffer()
+        self.framePool = QThreadPool(self)
+        self.frameLoaders: Dict[int, FrameLoader] = {}
+        self.cineTimer = QTimer(self)
+        self.cineTimer.timeout.connect(self.playNextFrame)
+
+        # 调整窗宽窗位时按下的位置与当时的窗位,窗宽
+        self.windowStart: Optional[Tuple[QPoint, float, float]] = None
+
+        # 鼠标移动只标记需要更新的点,窗宽窗位与状态栏,由定时器合并到下一帧统一绘制
+        self.updateTimer = QTimer(self)
+        self.updateTimer.setSingleShot(True)
+        self.updateTimer.setInterval(config.updateInterval)
+        self.updateTimer.timeout.connect(self.flushUpdate)
+        self.dirtyIndexs: Set[int] = set()
+        self.isWindowDirty = False
+        self.statusText = ''
+        self.statusTimer = QTimer(self)
+        self.statusTimer.setSingleShot(True)
+        self.statusTimer.setInterval(config.statusInterval)
+        self.statusTimer.timeout.connect(self.flushStatus)
+
+        # 标注随修改自动保存在图片旁
+        self.autoSaver = AutoSaver(self.stores, self)
+        self.autoSaver.failed.connect(self.handleSaveFailed)
+
+        # 导出在线程池中进行,不阻塞界面
+        self.exportEngine = ExportEngine(self)
+        self.exportEngine.failed.connect(self.handleExportFailed)
+        self.exportEngine.finished.connect(self.handleExportFinished)
 
     # 绑定事件
     def initEventConnections(self):
         self.imgView.viewport().installEventFilter(self)
         self.loadImgBtn.triggered.connect(self.uploadImg)
+        self.loadFolderBtn.triggered.connect(self.uploadFolder)
+        self.prevImgBtn.triggered.connect(self.prevImg)
+        self.nextImgBtn.triggered.connect(self.nextImg)
+        self.seriesList.currentRowChanged.connect(self.openSeriesImg)
+        self.seriesFilter.textChanged.connect(self.filterSeriesList)
+        self.searchCatalogBtn.triggered.connect(self.searchCatalog)
+        self.frameSlider.valueChanged.connect(self.selectFrame)
+        self.prevFrameBtn.triggered.connect(self.prevFrame)
+        self.nextFrameBtn.triggered.connect(self.nextFrame)
+        self.playFrameBtn.toggled.connect(self.playFrames)
+        self.resetWindowBtn.triggered.connect(self.resetWindow)
         self.storeImgBtn.triggered.connect(self.saveImg)
+        self.storeLabelBtn.triggered.connect(self.saveLabel)
+        self.exportSeriesBtn.triggered.connect(self.exportSeries)
         self.colorBox.currentIndexChanged.connect(self.changeColor)
         self.actionBox.currentIndexChanged.connect(self.changeMode)
         self.imgSizeSlider.valueChanged.connect(self.changeImgSizeSlider)
@@ -82,68 +182,440 @@ class LabelApp(QMainWindow, Ui_Form):
         self.addSizeBtn.triggered.connect(self.addImgSize)
         self.subSizeBtn.triggered.connect(self.subImgSize)
         self.originalSizeBtn.triggered.connect(self.originalImgSize)
-        self.quitAppBtn.triggered.connect(QCoreApplication.instance().quit)
+        self.quitAppBtn.triggered.connect(self.close)
         self.aiBtn.triggered.connect(self.aiPoint)
 
     # 更新关键点信息
+    @profiler.timed()
     def updatePivotsInfo(self):
-        if not self.img or not self.points or not self.pivots:
+        if not self.img or not self.store or not self.store.pivots:
             self.pivotsInfo.setMarkdown('')
             return None
-        pivots = list(self.pivots)
+        pivots = list(self.store.pivots)
         pivots.sort()
         mdInfo = ''
         for index in pivots:
-            point = self.getSrcPoint(self.points[index][0])
-            mdInfo += '{}: ({}, {})\n\n'.format(index, round(point.x(), 2), round(point.y(), 2))
+            x, y = self.store.getPoint(index)
+            mdInfo += '{}: ({}, {})\n\n'.format(index, round(x, 2), round(y, 2))
         self.pivotsInfo.setMarkdown(mdInfo)
 
     # 初始化画布
     def initImg(self):
         self.src = None
         self.img = None
-        self.ratioFromOld = 1
+        self.srcSize = QSize()
         self.ratioToSrc = 1
+        self.imgKey = None
+        self.imgItem.setSource(None)
+        self.scene.setSceneRect(QRectF())
         self.patientInfo.setMarkdown('')
 
-    # 更新图片,依据画布尺寸自动更新图片尺寸
+    # 更新图片,依据画布尺寸自动更新图片尺寸,只改变视图的缩放,不缩放像素
+    @profiler.timed()
     def updateImg(self):
         if not self.src:
             self.initImg()
             return None
-        old = self.img if self.img else self.src
-        size = QSize(
-            (self.imgView.width() - 2 * self.imgView.lineWidth()) * self.imgSize,
-            (self.imgView.height() - 2 * self.imgView.lineWidth()) * self.imgSize
-        )
-        self.img = self.src.scaled(size, Qt.KeepAspectRatio)
-        self.ratioFromOld = self.img.width() / old.width()
-        self.ratioToSrc = self.src.width() / self.img.width()
+        width = self.imgView.width() - 2 * self.imgView.lineWidth()
+        height = self.imgView.height() - 2 * self.imgView.lineWidth()
+        key = (self.src.cacheKey(), width, height, self.imgSize)
+        if self.img and key == self.imgKey:
+            return None
+        isNewSrc = not self.imgKey or self.imgKey[0] != key[0]
+        size = QSize(int(width * self.imgSize), int(height * self.imgSize))
+        self.img = self.srcSize.scaled(size, Qt.KeepAspectRatio)
+        self.imgKey = key
+        self.ratioToSrc = self.srcSize.width() / self.img.width()
+        self.imgView.setTransform(QTransform.fromScale(1 / self.ratioToSrc, 1 / self.ratioToSrc))
+        if LabelItem.unit != self.ratioToSrc:
+            LabelItem.unit = self.ratioToSrc
+            for items in (self.lineItems, self.angleItems, self.circleItems):
+                for item in items.values():
+                    item.updateRect()
+        if isNewSrc:
+            self.imgItem.setSource(self.src, self.srcSize)
+            self.scene.setSceneRect(QRectF(QPointF(), QSizeF(self.srcSize)))
+            self.stores.setCellSize(config.pointWidth * self.ratioToSrc)
+
+    # 取消正在打开的图片,已开始的读取完成后仍会放入缓存
+    def cancelLoad(self):
+        self.loadDir = None
+        self.loadHeader = ''
+        self.loadProgress.hide()
+
+    # 在后台线程读取图片,同一图片只读取一次
+    def startLoader(self, imgDir: str, isDcm: bool, priority: int):
+        if imgDir in self.loaders:
+            return None
+        loader = ImgLoader(imgDir, isDcm)
+        loader.signals.progress.connect(self.handleLoadProgress)
+        loader.signals.header.connect(self.handleHeader)
+        loader.signals.preview.connect(self.handlePreview)
+        loader.signals.loaded.connect(self.handleLoaded)
+        loader.signals.failed.connect(self.handleLoadFailed)
+        self.loaders[imgDir] = loader
+        self.loaderPool.start(loader, priority)
+
+    # 打开图片,缓存中有时直接显示,否则在后台读取,完成前不影响已打开的图片
+    def startLoad(self, imgDir: str, isDcm: bool):
+        if not static.isImgAccess(imgDir):
+            self.warning('The image file is not found or unreadable!')
+            return None
+        self.cancelLoad()
+        if cached := self.imgCache.get(imgDir):
+            self.showImg(imgDir, *cached)
+        else:
+            self.loadDir = imgDir
+            self.loadProgress.setValue(0)
+            self.loadProgress.show()
+            self.statusBar.showMessage(f'正在打开：{imgDir}')
+            self.startLoader(imgDir, isDcm, 1)
+        self.prefetch()
+
+    # 预读当前图片前后的图片,取消不再需要的读取
+    def prefetch(self):
+        neighbors = self.series.getNeighbors()
+        for imgDir in [imgDir for imgDir in self.loaders if imgDir != self.loadDir and imgDir not in neighbors]:
+            self.loaders.pop(imgDir).cancel()
+        for imgDir in neighbors:
+            if imgDir not in self.imgCache:
+                self.startLoader(imgDir, isDcmDir(imgDir), 0)
+
+    def handleLoadProgress(self, imgDir: str, value: int, text: str):
+        if imgDir != self.loadDir:
+            return None
+        self.loadProgress.setValue(value)
+        self.statusBar.showMessage(f'{text}  {self.loadHeader}' if self.loadHeader else text)
 
-    # 更新画布,添加图片到画布
-    def updateImgView(self):
-        scene = QGraphicsScene()
-        if self.img:
-            scene.addPixmap(self.img)
-        self.imgView.setScene(scene)
+    # 工作线程读取文件头后先在状态栏显示病人信息
+    # 病人信息栏与已显示的图片和标注对应,图片显示时才更新,读取失败时保持不变
+    def handleHeader(self, imgDir: str, header: str):
+        if imgDir != self.loadDir:
+            return None
+        self.loadHeader = header
+        self.statusBar.showMessage(f'正在打开：{imgDir}  {header}')
+
+    # 先显示缩小的预览,标注按原图尺寸恢复,窗宽窗位与切换帧在全分辨率图片读取完成后可用
+    def handlePreview(self, imgDir: str, img: object, mdInfo: str, width: int, height: int):
+        if imgDir != self.loadDir:
+            return None
+        preview = QPixmap.fromImage(img) if isinstance(img, QImage) else static.toQPixmap(img)
+        self.showImg(imgDir, preview, mdInfo, FrameBuffer(), QSize(width, height))
+
+    def handleLoaded(self, imgDir: str, img: object, mdInfo: str, frames: FrameBuffer):
+        self.loaders.pop(imgDir, None)
+        src = QPixmap.fromImage(img) if isinstance(img, QImage) else static.toQPixmap(img)
+        self.imgCache.put(imgDir, src, mdInfo, frames)
+        self.saveThumbnail(imgDir)
+        if imgDir != self.loadDir:
+            return None
+        self.cancelLoad()
+        self.statusBar.clearMessage()
+        if imgDir == self.imgDir and self.isPreview():
+            self.replacePreview(src, frames)
+        else:
+            self.showImg(imgDir, src, mdInfo, frames)
+
+    def handleLoadFailed(self, imgDir: str, text: str):
+        self.loaders.pop(imgDir, None)
+        if imgDir != self.loadDir:
+            return None
+        self.cancelLoad()
+        self.statusBar.clearMessage()
+        self.warning(text)
+
+    # 显示已解码的图片并恢复其标注,size不为空时src为该尺寸原图的预览
+    def showImg(self, imgDir: str, src: QPixmap, mdInfo: str, frames: FrameBuffer, size: Optional[QSize] = None):
+        self.autoSaver.close()
+        self.initAll()
+        self.imgDir = imgDir
+        self.frames = frames
+        # 缓存的图片是按默认窗宽窗位转换的
+        if frames.window and frames.window.isAdjusted() and 0 in frames:
+            src = self.getFrameImg(0)
+        self.src = src
+        self.srcSize = size or src.size()
+        self.patientInfo.setMarkdown(mdInfo)
+        self.loadLabel(imgDir)
+        self.syncSeries(imgDir)
+        self.updateFrameInfo()
+        self.prefetchFrames()
+        self.updateAll()
+
+    def isPreview(self):
+        return self.src is not None and self.src.size() != self.srcSize
+
+    # 全分辨率图片替换预览,原图尺寸不变,标注与缩放保持不变
+    def replacePreview(self, src: QPixmap, frames: FrameBuffer):
+        self.frames = frames
+        self.src = src
+        self.updateFrameInfo()
+        self.prefetchFrames()
+        self.updateImg()
+
+    # 停止播放并取消所有帧的解码
+    def initFrames(self):
+        self.playFrameBtn.setChecked(False)
+        for loader in self.frameLoaders.values():
+            loader.cancel()
+        self.frameLoaders.clear()
+        self.frames.trim()
+        self.frames = FrameBuffer()
+        self.updateFrameInfo()
+
+    def updateFrameInfo(self):
+        count = len(self.frames)
+        self.frameSlider.blockSignals(True)
+        self.frameSlider.setRange(0, count - 1)
+        self.frameSlider.setValue(self.frames.current)
+        self.frameSlider.blockSignals(False)
+        self.frameSlider.setEnabled(count > 1)
+        self.frameLabel.setText(f'帧：{self.frames.current + 1}/{count}')
+        for btn in (self.prevFrameBtn, self.nextFrameBtn, self.playFrameBtn):
+            btn.setEnabled(count > 1)
+
+    # 解码当前帧附近的帧,取消不再需要的解码
+    def prefetchFrames(self):
+        neighbors = self.frames.getNeighbors()
+        for index in [index for index in self.frameLoaders if index not in neighbors]:
+            self.frameLoaders.pop(index).cancel()
+        for priority, index in enumerate(neighbors):
+            if index in self.frames or index in self.frameLoaders:
+                continue
+            loader = FrameLoader(self.imgDir, index)
+            loader.signals.loaded.connect(self.handleFrameLoaded)
+            loader.signals.failed.connect(self.handleFrameFailed)
+            self.frameLoaders[index] = loader
+            self.framePool.start(loader, len(neighbors) - priority)
+
+    def handleFrameLoaded(self, imgDir: str, index: int, frame: numpy.ndarray):
+        if imgDir != self.imgDir:
+            return None
+        self.frameLoaders.pop(index, None)
+        self.frames.put(index, frame)
+        if index == self.frames.current and index != self.stores.frame:
+            self.showFrame(index)
+
+    def handleFrameFailed(self, imgDir: str, index: int, text: str):
+        if imgDir != self.imgDir:
+            return None
+        self.frameLoaders.pop(index, None)
+        self.playFrameBtn.setChecked(False)
+        self.statusBar.showMessage(text.replace('\n', ' '), 5000)
+
+    # 切换到第index帧,未解码时先保留当前画面,解码完成后再显示
+    def selectFrame(self, index: int):
+        if not self.src or not 0 <= index < len(self.frames):
+            return None
+        self.frames.current = index
+        self.updateFrameInfo()
+        self.prefetchFrames()
+        if index in self.frames:
+            self.showFrame(index)
+
+    # 按当前窗宽窗位转换已解码的帧
+    @profiler.timed('render')
+    def getFrameImg(self, index: int):
+        return static.toQPixmap(self.frames.render(self.frames.get(index)))
+
+    # 显示已解码的帧及其标注
+    def showFrame(self, index: int):
+        self.eraseHighlight()
+        self.src = self.getFrameImg(index)
+        self.store = self.stores.select(index)
+        self.updateAll()
+
+    # 拖动时只转换显示尺寸的图片,松开后再转换原图
+    def handleWindowMode(self, evt: QMouseEvent):
+        window = self.frames.window
+        frame = self.frames.get(self.stores.frame)
+        if window is None or frame is None:
+            return None
+        if evt.type() == QMouseEvent.MouseButtonPress and evt.button() == Qt.LeftButton:
+            self.windowStart = evt.pos(), window.center, window.width
+        elif evt.type() == QMouseEvent.MouseMove and self.windowStart:
+            pos, center, width = self.windowStart
+            step = width * config.windowSensitivity
+            window.setWindow(center + (evt.pos().y() - pos.y()) * step, width + (evt.pos().x() - pos.x()) * step)
+            self.isWindowDirty = True
+            self.scheduleUpdate()
+            self.showStatus(f'窗位：{round(window.center, 2)}, 窗宽：{round(window.width, 2)}')
+        elif evt.type() == QMouseEvent.MouseButtonRelease and self.windowStart:
+            self.windowStart = None
+            self.applyWindow()
+
+    @profiler.timed('render')
+    def previewWindow(self):
+        frame = self.frames.get(self.stores.frame)
+        if self.frames.window is None or frame is None or not self.img:
+            return None
+        self.imgItem.setPreview(static.toQPixmap(self.frames.window.renderPreview(frame, self.img.width(), self.img.height())))
+
+    def applyWindow(self):
+        self.isWindowDirty = False
+        if self.frames.get(self.stores.frame) is None:
+            return None
+        self.src = self.getFrameImg(self.stores.frame)
+        self.updateAll()
+
+    def resetWindow(self):
+        if self.frames.window:
+            self.frames.window.reset()
+            self.applyWindow()
+
+    def prevFrame(self):
+        self.selectFrame((self.frames.current - 1) % len(self.frames))
+
+    def nextFrame(self):
+        self.selectFrame((self.frames.current + 1) % len(self.frames))
+
+    # 按帧间隔循环播放
+    def playFrames(self, isPlaying: bool):
+        if isPlaying and len(self.frames) > 1:
+            self.cineTimer.start(max(1, int(self.frames.interval)))
+        else:
+            self.cineTimer.stop()
+        self.playFrameBtn.setText('暂停' if self.cineTimer.isActive() else '播放')
+
+    # 下一帧尚未解码完成时等待,不跳帧
+    def playNextFrame(self):
+        if self.frames.current == self.stores.frame:
+            self.nextFrame()
+
+    # 打开的图片不在当前文件夹时改为浏览其所在文件夹
+    def syncSeries(self, imgDir: str):
+        if (index := self.series.indexOf(imgDir)) == -1:
+            self.series.open(os.path.dirname(imgDir))
+            self.updateSeriesList()
+            index = self.series.indexOf(imgDir)
+        self.series.current = index
+        self.seriesList.blockSignals(True)
+        self.seriesList.setCurrentRow(index)
+        self.seriesList.blockSignals(False)
+
+    def updateSeriesList(self):
+        self.seriesList.blockSignals(True)
+        self.seriesList.clear()
+        self.seriesList.addItems([os.path.basename(imgDir) for imgDir in self.series.imgDirs])
+        self.seriesList.blockSignals(False)
+        self.filterSeriesList()
+        self.scanHeaders()
+
+    # 只读取文件头,不解码像素
+    def scanHeaders(self):
+        if self.headerLoader:
+            self.headerLoader.cancel()
+        imgDirs = [imgDir for imgDir in self.series.imgDirs if isDcmDir(imgDir)]
+        if not imgDirs:
+            self.headerLoader = None
+            return None
+        self.headerLoader = HeaderLoader(imgDirs, self.series.folderDir)
+        self.headerLoader.signals.loaded.connect(self.handleHeadersLoaded)
+        self.loaderPool.start(self.headerLoader, -1)
+
+    def handleHeadersLoaded(self, headers: list):
+        text = self.seriesFilter.text()
+        for imgDir, header, thumbnail in headers:
+            if (index := self.series.rows.get(imgDir)) is None:
+                continue
+            self.series.headers[imgDir] = header
+            item = self.seriesList.item(index)
+            item.setText(' '.join([os.path.basename(imgDir), header['PatientID'], header['StudyDate']]))
+            item.setToolTip('\n'.join(f'{key}: {value}' for key, value in header.items()))
+            item.setHidden(not self.series.isMatched(imgDir, text))
+            if thumbnail:
+                self.setThumbnail(imgDir, thumbnail)
+            else:
+                self.saveThumbnail(imgDir)
+
+    def setThumbnail(self, imgDir: str, thumbnail: bytes):
+        self.series.thumbnails.add(imgDir)
+        icon = QPixmap()
+        icon.loadFromData(thumbnail, 'PNG')
+        self.seriesList.item(self.series.rows[imgDir]).setIcon(QIcon(icon))
+
+    # 索引中有记录但没有缩略图的文件,解码后由缓存中的图片生成缩略图
+    def saveThumbnail(self, imgDir: str):
+        if not self.catalog or imgDir not in self.series.headers or imgDir in self.series.thumbnails:
+            return None
+        if not (cached := self.imgCache.get(imgDir)):
+            return None
+        thumbnail = static.toThumbnail(cached[0])
+        try:
+            self.catalog.putThumbnail(imgDir, thumbnail)
+        except sqlite3.Error:
+            return None
+        self.setThumbnail(imgDir, thumbnail)
+
+    # 在索引中搜索文件路径与文件头,列出所有浏览过的文件夹中匹配的文件
+    def searchCatalog(self):
+        if not self.catalog:
+            self.warning('The catalog can not be opened!')
+            return None
+        try:
+            imgDirs = self.catalog.search(self.seriesFilter.text(), config.catalogSearchLimit)
+        except sqlite3.Error as e:
+            self.warning(f'The catalog can not be searched!\n{e}')
+            return None
+        if not imgDirs:
+            self.warning('No indexed image file matches the search!')
+            return None
+        self.series.openList(imgDirs)
+        # 搜索结果可能只有路径匹配,不再按文件名与文件头过滤
+        self.seriesFilter.clear()
+        self.updateSeriesList()
+        self.statusBar.showMessage(f'索引中找到 {len(imgDirs)} 个文件')
+        self.openSeriesImg(0)
+
+    # 隐藏不匹配搜索内容的文件
+    def filterSeriesList(self):
+        text = self.seriesFilter.text()
+        for index, imgDir in enumerate(self.series.imgDirs):
+            self.seriesList.item(index).setHidden(not self.series.isMatched(imgDir, text))
+
+    # 从index开始按step方向找到第一个未被搜索隐藏的图片
+    def getMatchedIndex(self, index: int, step: int):
+        text = self.seriesFilter.text()
+        while 0 <= index < len(self.series) and not self.series.isMatched(self.series.imgDirs[index], text):
+            index += step
+        return index
+
+    # 打开文件夹中的第index张图片
+    def openSeriesImg(self, index: int):
+        if not 0 <= index < len(self.series):
+            return None
+        self.series.current = index
+        self.seriesList.blockSignals(True)
+        self.seriesList.setCurrentRow(index)
+        self.seriesList.blockSignals(False)
+        imgDir = self.series.imgDirs[index]
+        self.startLoad(imgDir, isDcmDir(imgDir))
+
+    def prevImg(self):
+        self.openSeriesImg(self.getMatchedIndex(self.series.current - 1, -1))
+
+    def nextImg(self):
+        self.openSeriesImg(self.getMatchedIndex(self.series.current + 1, 1))
+
+    # 打开文件夹,显示第一张图片
+    def uploadFolder(self):
+        folderDir = QFileDialog.getExistingDirectory(self, 'Open Image Folder', static.getHomeImgDir())
+        if not folderDir:
+            return None
+        self.series.open(folderDir)
+        self.updateSeriesList()
+        if not len(self.series):
+            self.warning('No image file is found in the folder!')
+            return None
+        self.openSeriesImg(0)
 
     # DICOM (*.dcm),得到dicom文件的pixmap和内含信息
     def loadDcmImg(self, imgDir: str):
-        if static.isImgAccess(imgDir):
-            self.src, mdInfo = static.getDcmImgAndMdInfo(imgDir)
-            self.patientInfo.setMarkdown(mdInfo)
-            self.updateAll()
-        else:
-            self.warning('The image file is not found or unreadable!')
+        self.startLoad(imgDir, True)
 
     # JPEG (*.jpg;*.jpeg;*.jpe), PNG (*.png)
     def loadImg(self, imgDir: str):
-        if static.isImgAccess(imgDir):
-            self.src = QPixmap()
-            self.src.load(imgDir)
-            self.updateAll()
-        else:
-            self.warning('The image file is not found or unreadable!')
+        self.startLoad(imgDir, False)
 
     # 上传图片到画布
     def uploadImg(self):
@@ -153,25 +625,122 @@ class LabelApp(QMainWindow, Ui_Form):
         imgDir, imgExt = QFileDialog.getOpenFileName(self, caption, static.getHomeImgDir(), extFilter, dcmFilter)
         if not imgDir:
             return None
-        self.initAll()
         if imgExt == dcmFilter:
             self.loadDcmImg(imgDir)
         else:
             self.loadImg(imgDir)
 
-    # 保存结果
+    # 在后台按原图尺寸导出当前帧与其标注,多帧图片与调整过的窗宽窗位按当前显示导出
     def saveImg(self):
         if not self.src:
             self.warning('Please upload an image file first!')
-        img = self.src.copy()
+            return None
+        if self.isPreview():
+            self.warning('The image is still loading!')
+            return None
+        if self.exportEngine.isBusy():
+            self.warning('The previous export is not finished yet!')
+            return None
         self.eraseHighlight()
-        self.updateLabels(img, True)
         caption = 'Save Image File'
-        extFilter = 'JPEG (*.jpg;*.jpeg;*.jpe);;PNG (*.png)'
+        # 过滤器 -> 没有输入扩展名时使用的扩展名
+        extFilters = {'JPEG (*.jpg;*.jpeg;*.jpe)': '.jpg', 'PNG (*.png)': '.png', 'TIFF 16 Bit (*.tif;*.tiff)': '.tif'}
         initFilter = 'JPEG (*.jpg;*.jpeg;*.jpe)'
-        imgDir, _ = QFileDialog.getSaveFileName(self, caption, static.getHomeImgDir(), extFilter, initFilter)
-        if imgDir:
-            img.save(imgDir)
+        imgDir, extFilter = QFileDialog.getSaveFileName(
+            self, caption, static.getHomeImgDir(), ';;'.join(extFilters), initFilter
+        )
+        if not imgDir:
+            return None
+        if not os.path.splitext(imgDir)[1]:
+            imgDir += extFilters.get(extFilter, '.jpg')
+        window = self.frames.window
+        window = (window.center, window.width) if window and window.isAdjusted() else None
+        self.exportEngine.start([ExportTask(self.imgDir, imgDir, config.exportQuality, self.stores.frame,
+                                            labels=annotation.toFrameDict(self.store), window=window,
+                                            scale=self.ratioToSrc)])
+        self.statusBar.showMessage(f'正在导出：{imgDir}')
+
+    # 导出文件列表中所有有标注的图片,每张图片一个任务并行导出,默认窗宽窗位
+    def exportSeries(self):
+        if self.exportEngine.isBusy():
+            self.warning('The previous export is not finished yet!')
+            return None
+        self.autoSaver.sync()
+        imgDirs = [imgDir for imgDir in self.series.imgDirs if annotation.hasAnnotation(imgDir)]
+        if not imgDirs:
+            self.warning('No annotated image file is found in the list!')
+            return None
+        ext, isOk = QInputDialog.getItem(self, 'Export Format', '格式', config.exportExts, 0, False)
+        if not isOk:
+            return None
+        # JPEG的质量,PNG的压缩程度(越高压缩越少);TIFF只选择压缩方式
+        quality = config.exportQuality
+        compression = config.exportCompression
+        if exportFormats[ext][0] == 'TIFF':
+            compression, isOk = QInputDialog.getInt(
+                self, 'Export Compression', '压缩方式(0为不压缩,1为LZW)', config.exportCompression, 0, 1
+            )
+        else:
+            quality, isOk = QInputDialog.getInt(self, 'Export Quality', '质量(-1为默认)', config.exportQuality, -1, 100)
+        if not isOk:
+            return None
+        folderDir = QFileDialog.getExistingDirectory(self, 'Export Folder', static.getHomeImgDir())
+        if not folderDir:
+            return None
+        self.exportEngine.start([ExportTask(imgDir, folderDir, quality, ext=ext, compression=compression)
+                                 for imgDir in imgDirs])
+        self.statusBar.showMessage(f'正在导出 {len(imgDirs)} 张图片')
+
+    def handleExportFailed(self, imgDir: str, text: str):
+        self.statusBar.showMessage(f'{imgDir}: {text}'.replace('\n', ' '), 5000)
+
+    def handleExportFinished(self, exportCount: int, failCount: int):
+        if failCount:
+            self.warning(f'{failCount} image file(s) can not be exported!')
+        self.statusBar.showMessage(f'已导出 {exportCount} 个文件', 5000)
+
+    # 读取图片已有的标注并开始自动保存
+    # 标注文件无法读取时不开启自动保存,以免覆盖;修改记录无法重放时保留标注文件的内容,修改记录改名为.journal.bad
+    def loadLabel(self, imgDir: str):
+        # 关系引用了不存在的点时抛出KeyError
+        errors = (OSError, ValueError, TypeError, KeyError, IndexError)
+        try:
+            generation = annotation.loadSnapshot(imgDir, self.stores)
+            isRestored = generation is not None
+            journalDir = annotation.getJournalDir(imgDir)
+            if os.path.isfile(journalDir):
+                ops = annotation.getJournalOps(annotation.readJournal(journalDir), generation or 0)
+                try:
+                    if ops is None:
+                        os.remove(journalDir)
+                    else:
+                        self.stores.replay(ops)
+                        isRestored = True
+                except errors as e:
+                    annotation.loadSnapshot(imgDir, self.stores)
+                    annotation.setJournalAside(imgDir)
+                    self.warning(f'The annotation journal can not be replayed and is renamed to .journal.bad!\n{e}')
+        except errors as e:
+            self.stores.clear()
+            self.store = self.stores.select(0)
+            self.warning(f'The annotation file can not be loaded! Autosave is off for this image.\n{e}')
+            return None
+        if isRestored:
+            self.statusBar.showMessage('已恢复标注', 3000)
+        self.store = self.stores.select(0)
+        self.autoSaver.open(imgDir, generation or 0)
+
+    # 立即写入完整标注
+    def saveLabel(self):
+        if not self.src:
+            self.warning('Please upload an image file first!')
+            return None
+        self.eraseHighlight()
+        self.autoSaver.save()
+        self.statusBar.showMessage('标注已保存', 3000)
+
+    def handleSaveFailed(self, text: str):
+        self.statusBar.showMessage(text.replace('\n', ' '), 5000)
 
     # 初始化颜色单选框
     def initColorBox(self):
@@ -228,7 +797,7 @@ class LabelApp(QMainWindow, Ui_Form):
 
     # 改变颜色
     def changeColor(self):
-        self.color = QColor(config.colorList[self.colorBox.currentIndex()])
+        self.color = self.colorBox.currentIndex()
 
     # 改变状态
     def changeMode(self):
@@ -251,6 +820,8 @@ class LabelApp(QMainWindow, Ui_Form):
             mode = LabelMode.MovePointMode
         elif text == '删除点':
             mode = LabelMode.ClearPointMode
+        elif text == '窗宽窗位':
+            mode = LabelMode.WindowMode
         else:
             mode = LabelMode.DefaultMode
         self.mode = mode
@@ -267,173 +838,11 @@ class LabelApp(QMainWindow, Ui_Form):
     # 清除点，线，角度，圆，中点，高
     def initExceptImg(self):
         self.initIndex()
-        self.points.clear()
-        self.lines.clear()
-        self.angles.clear()
-        self.circles.clear()
-        self.pivots.clear()
+        self.store.clear()
         self.initHighlight()
 
-    # 更新点位置
-    def updatePoints(self):
-        if not self.img or not self.points or self.ratioFromOld == 1:
-            return None
-        for point, _ in self.points.values():
-            point.setX(point.x() * self.ratioFromOld)
-            point.setY(point.y() * self.ratioFromOld)
-        self.ratioFromOld = 1
-
-    # 对应原图点位置
-    def getSrcPoint(self, point: QPointF):
-        return QPointF(point.x() * self.ratioToSrc, point.y() * self.ratioToSrc)
-
-    # 绘点
-    def labelPoints(self, img: Optional[QPixmap], toSrc: bool):
-        if not img or not self.points:
-            return None
-        painter = QPainter()
-        painter.begin(img)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        pen = QPen()
-        pen.setCapStyle(Qt.RoundCap)
-        font = QFont('Consolas')
-        if toSrc:
-            pen.setWidthF(config.pointWidth * self.ratioToSrc)
-            font.setPointSizeF(config.fontSize * self.ratioToSrc)
-        else:
-            pen.setWidthF(config.pointWidth)
-            font.setPointSizeF(config.fontSize)
-        painter.setFont(font)
-        for index, (point, color) in self.points.items():
-            labelPoint: QPointF
-            if toSrc:
-                pen.setColor(color)
-                labelPoint = self.getSrcPoint(point)
-            else:
-                pen.setColor(
-                    color if index != self.highlightMoveIndex and index not in self.highlightPoints
-                    else QColor.lighter(color)
-                )
-                labelPoint = point
-            painter.setPen(pen)
-            painter.drawPoint(labelPoint)
-            painter.drawText(static.getIndexShift(labelPoint), str(index))
-        painter.end()
-
-    # 绘线
-    def labelLines(self, img: Optional[QPixmap], toSrc: bool):
-        if not img or not self.lines:
-            return None
-        painter = QPainter()
-        painter.begin(img)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        pen = QPen()
-        pen.setCapStyle(Qt.RoundCap)
-        font = QFont('Consolas')
-        if toSrc:
-            pen.setWidthF(config.lineWidth * self.ratioToSrc)
-            font.setPointSizeF(config.fontSize * self.ratioToSrc)
-        else:
-            pen.setWidthF(config.lineWidth)
-            font.setPointSizeF(config.fontSize)
-        painter.setFont(font)
-        for (indexA, indexB), color in self.lines.items():
-            isHighlight = indexA in self.highlightPoints and indexB in self.highlightPoints \
-                and (self.mode == LabelMode.AngleMode or self.mode == LabelMode.VerticalMode)
-            pen.setColor(QColor.lighter(color) if isHighlight else color)
-            painter.setPen(pen)
-            A = self.points[indexA][0]
-            B = self.points[indexB][0]
-            srcA = self.getSrcPoint(A)
-            srcB = self.getSrcPoint(B)
-            labelPoint: QPointF
-            if toSrc:
-                painter.drawLine(srcA, srcB)
-                labelPoint = static.getMidpoint(srcA, srcB)
-            else:
-                painter.drawLine(A, B)
-                labelPoint = static.getMidpoint(A, B)
-            painter.drawText(static.getDistanceShift(A, B, labelPoint), str(round(static.getDistance(srcA, srcB), 2)))
-        painter.end()
-
-    # 绘角度
-    def labelAngles(self, img: Optional[QPixmap], toSrc: bool):
-        if not img or not self.angles:
-            return None
-        painter = QPainter()
-        painter.begin(img)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        pen = QPen()
-        pen.setCapStyle(Qt.RoundCap)
-        font = QFont('Consolas')
-        if toSrc:
-            pen.setWidthF(config.angleWidth * self.ratioToSrc)
-            font.setPointSizeF(config.fontSize * self.ratioToSrc)
-        else:
-            pen.setWidthF(config.angleWidth)
-            font.setPointSizeF(config.fontSize)
-        painter.setFont(font)
-        for (indexA, indexB, indexC), color in self.angles.items():
-            pen.setColor(color)
-            painter.setPen(pen)
-            A = self.points[indexA][0]
-            B = self.points[indexB][0]
-            C = self.points[indexC][0]
-            D, E = static.getDiagPoints(self.points[indexA][0], B, C)
-            F = static.getArcMidpoint(A, B, C)
-            labelRect: QRectF
-            labelPointA: QPointF
-            labelPointB: QPointF
-            if toSrc:
-                labelRect = QRectF(self.getSrcPoint(D), self.getSrcPoint(E))
-                labelPointA = self.getSrcPoint(B)
-                labelPointB = self.getSrcPoint(F)
-            else:
-                labelRect = QRectF(D, E)
-                labelPointA = B
-                labelPointB = F
-            deg = static.getDegree(A, B, C)
-            painter.drawArc(labelRect, int(static.getBeginDegree(A, B, C) * 16), int(deg * 16))
-            painter.drawText(static.getDegreeShift(labelPointA, labelPointB), str(round(deg, 2)) + '°')
-        painter.end()
-
-    # 绘圆
-    def labelCircles(self, img: Optional[QPixmap], toSrc: bool):
-        if not img or not self.circles:
-            return None
-        painter = QPainter()
-        painter.begin(img)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        pen = QPen()
-        pen.setCapStyle(Qt.RoundCap)
-        pen.setWidthF(config.lineWidth if not toSrc else config.lineWidth * self.ratioToSrc)
-        for (indexA, indexB), color in self.circles.items():
-            isHighlight = indexA in self.highlightPoints and indexB in self.highlightPoints \
-                and self.mode == LabelMode.CircleMode
-            pen.setColor(QColor.lighter(color) if isHighlight else color)
-            painter.setPen(pen)
-            A = self.points[indexA][0]
-            B = self.points[indexB][0]
-            painter.drawEllipse(
-                static.getMinBoundingRect(A, B) if not toSrc
-                else static.getMinBoundingRect(self.getSrcPoint(A), self.getSrcPoint(B))
-            )
-        painter.end()
-
     def erasePoint(self, index):
-        if index not in self.points:
-            return None
-        del self.points[index]
-        for line in list(self.lines.keys()):
-            if index in line:
-                del self.lines[line]
-        for angle in list(self.angles.keys()):
-            if index in angle:
-                del self.angles[angle]
-        for circle in list(self.circles.keys()):
-            if index in circle:
-                del self.circles[circle]
-        self.pivots.discard(index)
+        self.store.removePoint(index)
 
     def eraseHighlight(self):
         if self.mode == LabelMode.CircleMode:
@@ -443,36 +852,74 @@ class LabelApp(QMainWindow, Ui_Form):
         self.initHighlight()
         self.updateAll()
 
-    def updateLabels(self, img: Optional[QPixmap], toSrc: bool):
-        self.labelPoints(img, toSrc)
-        self.labelLines(img, toSrc)
-        self.labelAngles(img, toSrc)
-        self.labelCircles(img, toSrc)
-
-    def getImgPoint(self, point: QPointF):
-        return QPointF(point.x() / self.ratioToSrc, point.y() / self.ratioToSrc)
+    # 同步图元与标注,移除已删除的,新增缺少的
+    def syncItems(self, items: Dict, keys: Iterable, itemType: type):
+        keys = set(keys)
+        for key in [key for key in items if key not in keys]:
+            self.scene.removeItem(items.pop(key))
+        for key in keys:
+            if key not in items:
+                items[key] = itemType()
+                self.scene.addItem(items[key])
+        return items
+
+    # 两个端点都高亮的线或圆
+    def getHighlightKeys(self, relation: Relation):
+        return {key for index in self.highlightPoints for key in relation.links.get(index)
+                if all(i in self.highlightPoints for i in key)}
+
+    def getPoint(self, index: int):
+        return QPointF(*self.store.getPoint(index))
+
+    def getColor(self, color: int, isHighlight: bool = False):
+        return QColor.lighter(self.palette[color]) if isHighlight else self.palette[color]
+
+    # 更新图元,只有几何或高亮状态变化的图元会重绘
+    # indexs不为空时只更新这些点以及引用它们的线,角度,圆,其余图元与画布的其余区域不重绘
+    @profiler.timed()
+    def updateItems(self, indexs: Optional[Set[int]] = None):
+        store = self.store
+        if indexs is None:
+            points = self.syncItems(self.pointItems, store.getIndexs(), PointItem)
+            lines = list(self.syncItems(self.lineItems, store.lines, LineItem))
+            angles = list(self.syncItems(self.angleItems, store.angles, AngleItem))
+            circles = list(self.syncItems(self.circleItems, store.circles, CircleItem))
+        else:
+            points = {index: self.pointItems[index] for index in indexs if index in self.pointItems and index in store}
+            lines = list({key for index in points for key in store.lines.links.get(index)})
+            angles = list({key for index in points for key in store.angles.links.get(index)})
+            circles = list({key for index in points for key in store.circles.links.get(index)})
+        highlightLines = self.getHighlightKeys(store.lines) \
+            if self.mode == LabelMode.AngleMode or self.mode == LabelMode.VerticalMode else set()
+        highlightCircles = self.getHighlightKeys(store.circles) if self.mode == LabelMode.CircleMode else set()
+        for index, item in points.items():
+            isHighlight = index == self.highlightMoveIndex or index in self.highlightPoints
+            item.setPoint(self.getPoint(index), index, self.getColor(store.getPointColor(index), isHighlight))
+        for key, A, B, M, offset, text in getLineStates(store, lines):
+            color = self.getColor(store.lines.getColor(key), key in highlightLines)
+            self.lineItems[key].setLine(A, B, M, offset, text, color)
+        for key, rect, begin, degree, F, offset, text in getAngleStates(store, angles):
+            color = self.getColor(store.angles.getColor(key))
+            self.angleItems[key].setAngle(rect, begin, degree, F, offset, text, color)
+        for key, rect in getCircleStates(store, circles):
+            color = self.getColor(store.circles.getColor(key), key in highlightCircles)
+            self.circleItems[key].setCircle(rect, color)
 
     # 更新标号
     def getNewIndex(self):
-        return max(self.points.keys() if self.points else [0]) + 1
+        return self.store.getNewIndex()
 
     # 得到point位置标号
     def getPointIndex(self, point: QPointF):
-        if not self.img or not self.points:
+        if not self.img or not self.store:
             return -1
-        distance = config.pointWidth - config.eps
         # Index -1 means the point does not exist
-        index = -1
-        for idx, (pt, _) in self.points.items():
-            dis = static.getDistance(point, pt)
-            if dis < distance:
-                distance = dis
-                index = idx
-        return index
+        return self.store.getNearest(point.x(), point.y(), (config.pointWidth - config.eps) * self.ratioToSrc)
 
     def isPointOutOfBound(self, point: QPointF):
-        return point.x() < config.pointWidth / 2 or point.x() > self.img.width() - config.pointWidth / 2 \
-            or point.y() < config.pointWidth / 2 or point.y() > self.img.height() - config.pointWidth / 2
+        r = config.pointWidth / 2 * self.ratioToSrc
+        return point.x() < r or point.x() > self.srcSize.width() - r or point.y() < r \
+            or point.y() > self.srcSize.height() - r
 
     # 得到有效标号数量
     def getIndexCnt(self):
@@ -480,7 +927,7 @@ class LabelApp(QMainWindow, Ui_Form):
 
     # 判断高亮
     def triggerIndex(self, index: int):
-        if not self.img or not self.points or index == -1:
+        if not self.img or not self.store or index == -1:
             return None
         if index in [self.indexA, self.indexB, self.indexC]:
             indexs = [i for i in [self.indexA, self.indexB, self.indexC] if i != index]
@@ -506,25 +953,28 @@ class LabelApp(QMainWindow, Ui_Form):
         self.endTrigger()
         self.highlightMoveIndex = index
 
-    # 添加到各个字典中
+    # 添加到标注数据中
     def addPoint(self, point: QPointF):
         if self.img:
             index = self.getNewIndex()
-            self.points[index] = point, self.color
+            self.store.addPoint(index, point.x(), point.y(), self.color)
             return index
 
+    # 移动点
+    def movePoint(self, index: int, point: QPointF):
+        self.store.movePoint(index, point.x(), point.y())
+
     def addLine(self, indexA: int, indexB: int):
-        if self.img and indexA in self.points and indexB in self.points:
-            self.lines[static.getLineKey(indexA, indexB)] = self.color
+        if self.img and indexA in self.store and indexB in self.store:
+            self.store.addLine(indexA, indexB, self.color)
 
     def addAngle(self, indexA: int, indexB: int, indexC: int):
-        if self.img and static.getLineKey(indexA, indexB) in self.lines \
-                and static.getLineKey(indexB, indexC) in self.lines:
-            self.angles[static.getAngleKey(indexA, indexB, indexC)] = self.color
+        if self.img and self.store.hasLine(indexA, indexB) and self.store.hasLine(indexB, indexC):
+            self.store.addAngle(indexA, indexB, indexC, self.color)
 
     def addCircle(self, indexA: int, indexB: int):
-        if self.img and indexA in self.points and indexB in self.points:
-            self.circles[(indexA, indexB)] = self.color
+        if self.img and indexA in self.store and indexB in self.store:
+            self.store.addCircle(indexA, indexB, self.color)
 
     # 点击事件
     def handlePointMode(self, evt: QMouseEvent):
@@ -533,7 +983,7 @@ class LabelApp(QMainWindow, Ui_Form):
         point = self.imgView.mapToScene(evt.pos())
         index = self.getPointIndex(point)
         if index != -1:
-            self.points[index] = self.points[index][0], self.color
+            self.store.setPointColor(index, self.color)
         else:
             self.addPoint(point)
         self.updateAll()
@@ -556,10 +1006,10 @@ class LabelApp(QMainWindow, Ui_Form):
         if evt.type() != QMouseEvent.MouseButtonPress:
             return None
         self.triggerIndex(self.getPointIndex(self.imgView.mapToScene(evt.pos())))
-        if self.getIndexCnt() == 2 and static.getLineKey(self.indexA, self.indexB) not in self.lines:
+        if self.getIndexCnt() == 2 and not self.store.hasLine(self.indexA, self.indexB):
             self.triggerIndex(self.indexA)
         elif self.getIndexCnt() == 3:
-            if static.getLineKey(self.indexB, self.indexC) in self.lines:
+            if self.store.hasLine(self.indexB, self.indexC):
                 self.addAngle(self.indexA, self.indexB, self.indexC)
                 self.endTriggerWith(self.indexC)
             else:
@@ -570,6 +1020,11 @@ class LabelApp(QMainWindow, Ui_Form):
 
     def handleCircleMode(self, evt: QMouseEvent):
         point = self.imgView.mapToScene(evt.pos())
+        if evt.type() == QMouseEvent.MouseMove:
+            if self.getIndexCnt() == 2 and not self.isPointOutOfBound(point):
+                self.movePoint(self.indexB, point)
+                self.scheduleUpdate({self.indexB})
+            return None
         if self.getPointIndex(point) == -1:
             if evt.type() == QMouseEvent.MouseButtonPress:
                 if self.getIndexCnt() == 0:
@@ -580,9 +1035,6 @@ class LabelApp(QMainWindow, Ui_Form):
                     self.addCircle(self.indexA, self.indexB)
                 elif self.getIndexCnt() == 2:
                     self.endTriggerWith(self.indexB)
-            elif evt.type() == QMouseEvent.MouseMove and self.getIndexCnt() == 2 and not self.isPointOutOfBound(point):
-                self.points[self.indexB][0].setX(point.x())
-                self.points[self.indexB][0].setY(point.y())
         else:
             if evt.type() == QMouseEvent.MouseButtonPress:
                 if self.getIndexCnt() == 0:
@@ -593,9 +1045,6 @@ class LabelApp(QMainWindow, Ui_Form):
                     self.addCircle(self.indexA, self.indexB)
                 elif self.getIndexCnt() == 2:
                     self.endTriggerWith(self.indexB)
-            elif evt.type() == QMouseEvent.MouseMove and self.getIndexCnt() == 2 and not self.isPointOutOfBound(point):
-                self.points[self.indexB][0].setX(point.x())
-                self.points[self.indexB][0].setY(point.y())
         self.updateAll()
 
     def handleMidpointMode(self, evt: QMouseEvent):
@@ -603,9 +1052,9 @@ class LabelApp(QMainWindow, Ui_Form):
             return None
         self.triggerIndex(self.getPointIndex(self.imgView.mapToScene(evt.pos())))
         if self.getIndexCnt() == 2:
-            if static.getLineKey(self.indexA, self.indexB) in self.lines:
-                A = self.points[self.indexA][0]
-                B = self.points[self.indexB][0]
+            if self.store.hasLine(self.indexA, self.indexB):
+                A = self.getPoint(self.indexA)
+                B = self.getPoint(self.indexB)
                 indexC = self.addPoint(static.getMidpoint(A, B))
                 self.addLine(self.indexA, indexC)
                 self.addLine(self.indexB, indexC)
@@ -619,14 +1068,14 @@ class LabelApp(QMainWindow, Ui_Form):
             return None
         self.triggerIndex(self.getPointIndex(self.imgView.mapToScene(evt.pos())))
         if self.getIndexCnt() == 2:
-            if static.getLineKey(self.indexA, self.indexB) not in self.lines:
+            if not self.store.hasLine(self.indexA, self.indexB):
                 self.triggerIndex(self.indexA)
         elif self.getIndexCnt() == 3:
-            A = self.points[self.indexA][0]
-            B = self.points[self.indexB][0]
-            C = self.points[self.indexC][0]
+            A = self.getPoint(self.indexA)
+            B = self.getPoint(self.indexB)
+            C = self.getPoint(self.indexC)
             if static.isOnALine(A, B, C):
-                if static.getLineKey(self.indexB, self.indexC) in self.lines:
+                if self.store.hasLine(self.indexB, self.indexC):
                     self.triggerIndex(self.indexA)
                 else:
                     indexC = self.indexC
@@ -645,38 +1094,78 @@ class LabelApp(QMainWindow, Ui_Form):
 
     def handleDragMode(self, evt: QMouseEvent):
         point = self.imgView.mapToScene(evt.pos())
+        if evt.type() == QMouseEvent.MouseMove:
+            if self.getIndexCnt() == 1 and not self.isPointOutOfBound(point):
+                self.movePoint(self.indexA, point)
+                self.scheduleUpdate({self.indexA})
+            return None
         if evt.type() == QMouseEvent.MouseButtonPress and self.getIndexCnt() == 0:
             self.triggerIndex(self.getPointIndex(point))
-        elif evt.type() == QMouseEvent.MouseMove and self.getIndexCnt() == 1 and not self.isPointOutOfBound(point):
-            self.points[self.indexA][0].setX(point.x())
-            self.points[self.indexA][0].setY(point.y())
         elif evt.type() == QMouseEvent.MouseButtonRelease and self.getIndexCnt() == 1:
             self.triggerIndex(self.indexA)
         self.updateAll()
 
     def handleClearPointMode(self, evt: QMouseEvent):
+        if evt.type() != QMouseEvent.MouseButtonPress:
+            return None
         index = self.getPointIndex(self.imgView.mapToScene(evt.pos()))
-        if evt.type() == QMouseEvent.MouseButtonPress and index != -1:
+        if index != -1:
             self.erasePoint(index)
         self.updateAll()
 
     def handleHighlightMove(self, evt: QMouseEvent):
         point = self.imgView.mapToScene(evt.pos())
-        self.highlightMoveIndex = self.getPointIndex(point)
-        text = f'坐标：{round(point.x(), 2)}, {round(point.y(), 2)}'
-        self.statusBar.showMessage(text, 1000)
-        self.updateAll()
+        index = self.getPointIndex(point)
+        indexs = {self.highlightMoveIndex, index}
+        self.highlightMoveIndex = index
+        self.showStatus(f'坐标：{round(point.x(), 2)}, {round(point.y(), 2)}')
+        self.scheduleUpdate(indexs)
 
     def initAll(self):
         self.initImg()
+        self.initFrames()
         self.initExceptImg()
+        self.stores.clear()
+        self.store = self.stores.select(0)
 
     def updateAll(self):
+        self.dirtyIndexs.clear()
         self.updateImg()
-        self.updatePoints()
-        self.updateLabels(self.img, False)
-        self.updateImgView()
+        self.updateItems()
         self.updatePivotsInfo()
+        self.autoSaver.schedule()
+
+    # 只有indexs中的点移动或改变高亮时使用
+    def updateDirty(self, indexs: Set[int]):
+        self.updateItems(indexs)
+        if not self.store.pivots.isdisjoint(indexs):
+            self.updatePivotsInfo()
+        self.autoSaver.schedule()
+
+    # 标记需要更新的点,同一帧内的多次移动只绘制一次
+    def scheduleUpdate(self, indexs: Iterable[int] = ()):
+        self.dirtyIndexs.update(indexs)
+        if not self.updateTimer.isActive():
+            self.updateTimer.start()
+
+    @profiler.timed()
+    def flushUpdate(self):
+        if self.isWindowDirty:
+            self.isWindowDirty = False
+            self.previewWindow()
+        if self.dirtyIndexs:
+            indexs = set(self.dirtyIndexs)
+            self.dirtyIndexs.clear()
+            self.updateDirty(indexs)
+
+    # 状态栏最多每config.statusInterval毫秒刷新一次,其间只保留最新的文本
+    def showStatus(self, text: str):
+        self.statusText = text
+        if not self.statusTimer.isActive():
+            self.statusTimer.start()
+
+    def flushStatus(self):
+        self.statusBar.showMessage(self.statusText, 1000)
 
     # 清除所有点，还原图片
     def initImgWithPoints(self):
@@ -687,11 +1176,29 @@ class LabelApp(QMainWindow, Ui_Form):
 
     # 清除图片
     def clearImg(self):
+        self.cancelLoad()
         if not self.src:
             return None
+        self.autoSaver.close()
         self.initAll()
         self.updateAll()
 
+    # 刷新状态栏的帧率与各阶段耗时
+    def updateProfileInfo(self):
+        self.profileLabel.setText(profiler.getSummary())
+
+    # 关闭前写入标注
+    def closeEvent(self, evt: QCloseEvent):
+        self.cancelLoad()
+        if self.headerLoader:
+            self.headerLoader.cancel()
+        if self.catalog:
+            self.catalog.close()
+            self.catalog = None
+        self.autoSaver.close()
+        self.exportEngine.wait()
+        super().closeEvent(evt)
+
     # 自动适应窗口
     def resizeEvent(self, _: QResizeEvent):
         self.updateAll()
@@ -708,45 +1215,21 @@ class LabelApp(QMainWindow, Ui_Form):
         if newIndex <= 0:
             self.warning('标号不可小于或等于0！')
             return None
-        if newIndex in self.points:
+        if newIndex in self.store:
             self.warning('此标号已存在!')
             return None
-        self.points[newIndex] = self.points[index]
-        del self.points[index]
-        for line in list(self.lines.keys()):
-            if index in line:
-                fixedIndex = line[0] + line[1] - index
-                self.lines[static.getLineKey(newIndex, fixedIndex)] = self.lines[line]
-                del self.lines[line]
-        for angle in list(self.angles.keys()):
-            if index in angle:
-                if index == angle[1]:
-                    self.angles[angle[0], newIndex, angle[2]] = self.angles[angle]
-                else:
-                    fixedIndex = angle[0] + angle[2] - index
-                    self.angles[static.getAngleKey(newIndex, angle[1], fixedIndex)] = self.angles[angle]
-                del self.angles[angle]
-        for circle in list(self.circles.keys()):
-            if index in circle:
-                if index == circle[0]:
-                    self.circles[(newIndex, circle[1])] = self.circles[circle]
-                else:
-                    self.circles[(circle[0], newIndex)] = self.circles[circle]
-                del self.circles[circle]
-        if index in self.pivots:
-            self.pivots.remove(index)
-            self.pivots.add(newIndex)
+        self.store.renamePoint(index, newIndex)
 
     def addPivots(self, index: int):
-        if self.img and index in self.points:
-            self.pivots.add(index)
+        if self.img and index in self.store:
+            self.store.addPivot(index)
 
     def removePivots(self, index: int):
-        if self.img and self.pivots:
-            self.pivots.discard(index)
+        if self.img and self.store.pivots:
+            self.store.removePivot(index)
 
     def switchPivotState(self, index: int):
-        if index not in self.pivots:
+        if index not in self.store.pivots:
             self.addPivots(index)
         else:
             self.removePivots(index)
@@ -756,7 +1239,7 @@ class LabelApp(QMainWindow, Ui_Form):
         modifyIndex = QAction('更改标号', self.rightBtnMenu)
         modifyIndexTriggered: pyqtBoundSignal = modifyIndex.triggered
         modifyIndexTriggered.connect(lambda: self.modifyIndex(index))
-        switchPivotState = QAction('删除该点信息' if index in self.pivots else '查看该点信息', self.rightBtnMenu)
+        switchPivotState = QAction('删除该点信息' if index in self.store.pivots else '查看该点信息', self.rightBtnMenu)
         switchPivotStateTriggered: pyqtBoundSignal = switchPivotState.triggered
         switchPivotStateTriggered.connect(lambda: self.switchPivotState(index))
         erasePoint = QAction('清除该点', self.rightBtnMenu)
@@ -779,6 +1262,8 @@ class LabelApp(QMainWindow, Ui_Form):
             self.updateAll()
 
     def eventFilter(self, obj: QObject, evt: QEvent):
+        if obj is self.imgView.viewport() and evt.type() == QEvent.Paint:
+            profiler.addFrame()
         if not self.img or obj is not self.imgView.viewport() or evt.type() not in self.targetEventType:
             return super().eventFilter(obj, evt)
         if self.mode == LabelMode.PointMode:
@@ -797,7 +1282,9 @@ class LabelApp(QMainWindow, Ui_Form):
             self.handleDragMode(evt)
         elif self.mode == LabelMode.ClearPointMode:
             self.handleClearPointMode(evt)
-        if evt.type() == QMouseEvent.MouseMove:
+        elif self.mode == LabelMode.WindowMode:
+            self.handleWindowMode(evt)
+        if evt.type() == QMouseEvent.MouseMove and not self.windowStart:
             self.handleHighlightMove(evt)
         elif evt.type() == QMouseEvent.MouseButtonPress and QMouseEvent(evt).button() == Qt.RightButton:
             self.handleRightBtnMenu(evt)
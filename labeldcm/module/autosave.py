@@ -0,0 +1,115 @@
+from labeldcm.module import annotation
+from labeldcm.module.config import config
+from labeldcm.module.store import FrameStores
+from PyQt5.QtCore import pyqtSignal, QObject, QRunnable, QThreadPool, QTimer
+from typing import List, Optional
+import os
+
+class SaverSignals(QObject):
+    failed = pyqtSignal(str)
+
+# 追加修改记录,或写入完整标注并删除修改记录
+# 新建的修改记录第一行记下generation,与标注文件的代数相同,见annotation.getJournalOps
+class SaveTask(QRunnable):
+    def __init__(self, imgDir: str, generation: int, ops: List[list], data: Optional[dict] = None):
+        super(SaveTask, self).__init__()
+        self.imgDir = imgDir
+        self.generation = generation
+        self.ops = ops
+        self.data = data
+        self.signals = SaverSignals()
+
+    def run(self):
+        try:
+            journalDir = annotation.getJournalDir(self.imgDir)
+            if self.ops:
+                header = [] if os.path.isfile(journalDir) else [['generation', self.generation]]
+                annotation.appendJournal(header + self.ops, journalDir)
+            if self.data is not None:
+                annotation.writeAnnotation(self.data, annotation.getAnnotationDir(self.imgDir))
+                if os.path.isfile(journalDir):
+                    os.remove(journalDir)
+        except OSError as e:
+            self.signals.failed.emit(f'The annotation can not be saved!\n{e}')
+
+# 自动保存：标注的修改先记在内存,定时在后台线程追加到修改记录,记录过多时合并成完整标注
+class AutoSaver(QObject):
+    failed = pyqtSignal(str)
+
+    def __init__(self, stores: FrameStores, parent: Optional[QObject] = None):
+        super(AutoSaver, self).__init__(parent)
+        self.stores = stores
+        self.imgDir: Optional[str] = None
+        self.journalSize = 0
+        # 标注文件的代数,每次写入完整标注加一
+        self.generation = 0
+        # 单线程保证写入顺序
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(config.autosaveInterval)
+        self.timer.timeout.connect(self.flush)
+
+    # 开始记录imgDir的标注,stores应已载入该图片已有的标注,generation为已有标注文件的代数
+    def open(self, imgDir: str, generation: int = 0):
+        self.close()
+        self.imgDir = imgDir
+        self.journalSize = 0
+        self.generation = generation
+        self.stores.setJournal(True)
+
+    # 有修改时延迟写入,拖动等连续修改合并为一次
+    def schedule(self):
+        if self.imgDir and self.stores.journal and not self.timer.isActive():
+            self.timer.start()
+
+    # 连续移动同一点只保留最后一次
+    @staticmethod
+    def getMergedOps(ops: List[list]):
+        merged: List[list] = []
+        for op in ops:
+            if merged and op[0] == 'movePoint' and merged[-1][0] == 'movePoint' and merged[-1][1] == op[1]:
+                merged[-1] = op
+            else:
+                merged.append(op)
+        return merged
+
+    def start(self, ops: List[list], data: Optional[dict] = None):
+        task = SaveTask(self.imgDir, self.generation, ops, data)
+        task.signals.failed.connect(self.failed)
+        self.pool.start(task)
+
+    def flush(self):
+        self.timer.stop()
+        if not self.imgDir or not self.stores.journal:
+            return None
+        ops = self.getMergedOps(self.stores.takeJournal())
+        self.journalSize += len(ops)
+        if self.journalSize >= config.journalLimit:
+            self.save()
+        else:
+            self.start(ops)
+
+    # 写入未保存的修改并等待完成,之后可以从文件读取当前标注
+    def sync(self):
+        self.flush()
+        self.pool.waitForDone()
+
+    # 写入完整标注
+    def save(self):
+        if not self.imgDir:
+            return None
+        self.timer.stop()
+        self.stores.takeJournal()
+        self.journalSize = 0
+        self.generation += 1
+        self.start([], {**annotation.toDict(self.stores), 'generation': self.generation})
+
+    # 保存并停止记录,等待写入完成
+    def close(self):
+        if self.imgDir and (self.stores.journal or self.journalSize):
+            self.save()
+        self.stores.setJournal(False)
+        self.imgDir = None
+        self.pool.waitForDone()
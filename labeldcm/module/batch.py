@@ -0,0 +1,91 @@
+from labeldcm.module import annotation, static
+from labeldcm.module.store import FrameStores, LabelStore
+from concurrent.futures import ProcessPoolExecutor
+from pydicom import dcmread
+from typing import List, Optional, Tuple
+import argparse
+import csv
+import numpy
+import os
+import sys
+
+columns = ['file', 'frame', 'type', 'indexs', 'pixel', 'mm']
+
+# 目录下所有带标注文件或修改记录的dcm文件
+def getDcmDirs(rootDir: str):
+    dcmDirs = []
+    for dirPath, _, fileNames in os.walk(rootDir):
+        for fileName in fileNames:
+            dcmDir = os.path.join(dirPath, fileName)
+            if fileName.lower().endswith('.dcm') and annotation.hasAnnotation(dcmDir):
+                dcmDirs.append(dcmDir)
+    return sorted(dcmDirs)
+
+# 线长，角度，圆半径；spacing为空时mm一列为None，角度两列都为度数
+def measureStore(store: LabelStore, spacing: Optional[Tuple[float, float]]):
+    scale = numpy.array(spacing if spacing else (1, 1))
+    results = []
+    for name, relation in zip(('line', 'angle', 'circle'), store.getRelations()):
+        coords = store.getCoords(relation)
+        if name == 'angle':
+            pixel = static.getDegrees(coords[:, 0], coords[:, 1], coords[:, 2])
+            coords = coords * scale
+            mm = static.getDegrees(coords[:, 0], coords[:, 1], coords[:, 2])
+        else:
+            pixel = static.getDistances(coords[:, 0], coords[:, 1])
+            coords = coords * scale
+            mm = static.getDistances(coords[:, 0], coords[:, 1])
+        for key, valuePixel, valueMm in zip(relation, pixel.tolist(), mm.tolist()):
+            results.append((name, '-'.join(map(str, key)), valuePixel, valueMm if spacing else None))
+    return results
+
+# 在子进程中运行，只读取文件头，不解码像素；标注与程序中看到的一致，包括尚未合并的修改记录
+def measureFile(dcmDir: str):
+    dcm = dcmread(dcmDir, stop_before_pixels=True)
+    stores = FrameStores()
+    annotation.loadAnnotation(dcmDir, stores)
+    spacing = static.getPixelSpacing(dcm)
+    return [(dcmDir, frame, *row) for frame, store in stores for row in measureStore(store, spacing)]
+
+# 出错的文件不影响其他文件
+def tryMeasureFile(dcmDir: str):
+    try:
+        return measureFile(dcmDir), ''
+    except Exception as e:
+        return [], f'{dcmDir}: {e}'
+
+def writeCsv(rows: List[tuple], outDir: str):
+    with open(outDir, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+# Parquet需要pandas与pyarrow
+def writeParquet(rows: List[tuple], outDir: str):
+    try:
+        import pandas
+    except ImportError:
+        raise SystemExit('Writing parquet requires pandas and pyarrow!')
+    pandas.DataFrame(rows, columns=columns).to_parquet(outDir, index=False)
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(prog='label-dcm.py measure', description='批量测量已标注的dcm文件')
+    parser.add_argument('root', help='dcm文件所在目录，标注文件与dcm文件同名，扩展名为.json与.journal')
+    parser.add_argument('-o', '--output', required=True, help='输出文件，扩展名为.csv或.parquet')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='进程数')
+    args = parser.parse_args(argv)
+    dcmDirs = getDcmDirs(args.root)
+    rows = []
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for result, error in executor.map(tryMeasureFile, dcmDirs, chunksize=16):
+            rows.extend(result)
+            if error:
+                failed += 1
+                print(error, file=sys.stderr)
+    if args.output.lower().endswith('.parquet'):
+        writeParquet(rows, args.output)
+    else:
+        writeCsv(rows, args.output)
+    print(f'{len(dcmDirs) - failed} files, {len(rows)} measurements, {failed} failed', file=sys.stderr)
+    return 1 if failed else 0
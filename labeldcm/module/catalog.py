@@ -0,0 +1,135 @@
+from labeldcm.module import static
+from labeldcm.module.config import config
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 表结构不兼容时递增,旧表直接丢弃重建
+version = 1
+
+headerKeys = ('PatientID', 'PatientName', 'StudyDate', 'Modality')
+
+schema = f'''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    {', '.join(f'{key} TEXT NOT NULL' for key in headerKeys)},
+    thumbnail BLOB
+);
+CREATE INDEX IF NOT EXISTS filesFolder ON files (folder);
+'''
+
+# 路径统一为绝对路径,作为索引的主键
+def getCatalogKey(imgDir: str):
+    return os.path.normcase(os.path.abspath(imgDir))
+
+# (修改时间, 大小),与索引中记录的不同时重新读取文件头
+def getFileStat(imgDir: str):
+    stat = os.stat(imgDir)
+    return stat.st_mtime_ns, stat.st_size
+
+# dcm文件头与缩略图的本地索引,键为文件路径,文件的修改时间或大小变化后记录失效
+# 每个线程使用自己的Catalog,sqlite的WAL模式下读取不阻塞写入
+class Catalog(object):
+    def __init__(self, catalogDir: str):
+        if folderDir := os.path.dirname(catalogDir):
+            os.makedirs(folderDir, exist_ok=True)
+        self.db = sqlite3.connect(catalogDir, timeout=config.catalogTimeout)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != version:
+            self.db.execute('DROP TABLE IF EXISTS files')
+            self.db.execute(f'PRAGMA user_version={version}')
+        self.db.executescript(schema)
+
+    def close(self):
+        self.db.close()
+
+    # 索引中的记录,值为((修改时间, 大小), 文件头, 缩略图)
+    def getEntries(self, imgDirs: Iterable[str]):
+        keys = {getCatalogKey(imgDir): imgDir for imgDir in imgDirs}
+        entries: Dict[str, Tuple[Tuple[int, int], Dict[str, str], Optional[bytes]]] = {}
+        columns = ', '.join(headerKeys)
+        # 查询参数个数有上限,分批查询
+        paths = list(keys)
+        for begin in range(0, len(paths), config.catalogQuerySize):
+            batch = paths[begin:begin + config.catalogQuerySize]
+            rows = self.db.execute(
+                f'SELECT path, mtime, size, {columns}, thumbnail FROM files WHERE path IN ({",".join("?" * len(batch))})',
+                batch
+            )
+            for path, mtime, size, *values, thumbnail in rows:
+                entries[keys[path]] = (mtime, size), dict(zip(headerKeys, values)), thumbnail
+        return entries
+
+    # 写入新读取的文件头,旧的缩略图作废
+    def put(self, imgDir: str, stat: Tuple[int, int], header: Dict[str, str]):
+        key = getCatalogKey(imgDir)
+        self.db.execute(
+            f'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, {", ".join("?" * len(headerKeys))}, NULL)',
+            (key, os.path.dirname(key), *stat, *(header.get(name, '') for name in headerKeys))
+        )
+
+    def putThumbnail(self, imgDir: str, thumbnail: bytes):
+        self.db.execute('UPDATE files SET thumbnail = ? WHERE path = ?', (thumbnail, getCatalogKey(imgDir)))
+        self.db.commit()
+
+    def remove(self, imgDirs: Iterable[str]):
+        self.db.executemany('DELETE FROM files WHERE path = ?', [(getCatalogKey(imgDir),) for imgDir in imgDirs])
+
+    # 删除文件夹中已不存在的文件的记录
+    def prune(self, folderDir: str, imgDirs: Iterable[str]):
+        keys = {getCatalogKey(imgDir) for imgDir in imgDirs}
+        rows = self.db.execute('SELECT path FROM files WHERE folder = ?', (getCatalogKey(folderDir),)).fetchall()
+        self.db.executemany('DELETE FROM files WHERE path = ?', [row for row in rows if row[0] not in keys])
+
+    def commit(self):
+        self.db.commit()
+
+    # 文件路径或文件头包含text的记录,按病人ID,检查日期,路径排序,最多limit条
+    def search(self, text: str, limit: int):
+        pattern = '%' + text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions = ' OR '.join(f"{key} LIKE ? ESCAPE '\\'" for key in ('path',) + headerKeys)
+        rows = self.db.execute(
+            f'SELECT path FROM files WHERE {conditions} ORDER BY PatientID, StudyDate, path LIMIT ?',
+            (pattern,) * (len(headerKeys) + 1) + (limit,)
+        )
+        return [path for path, in rows]
+
+# 打开默认位置的索引,无法打开时返回None,浏览文件夹时退回为逐个读取文件头
+def openCatalog():
+    try:
+        return Catalog(config.catalogDir)
+    except (OSError, sqlite3.Error):
+        return None
+
+# 按文件的修改时间与大小区分可直接使用的记录与需要重新读取的文件
+# 返回([(imgDir, 文件头, 缩略图)], [(imgDir, (修改时间, 大小))], [已不存在的imgDir])
+def getChanges(catalog: Catalog, imgDirs: List[str]):
+    entries = catalog.getEntries(imgDirs)
+    fresh: List[Tuple[str, Dict[str, str], Optional[bytes]]] = []
+    changed: List[Tuple[str, Tuple[int, int]]] = []
+    missing: List[str] = []
+    for imgDir in imgDirs:
+        try:
+            stat = getFileStat(imgDir)
+        except OSError:
+            missing.append(imgDir)
+            continue
+        entry = entries.get(imgDir)
+        if entry and entry[0] == stat:
+            fresh.append((imgDir, entry[1], entry[2]))
+        else:
+            changed.append((imgDir, stat))
+    return fresh, changed, missing
+
+# 读取文件头并写入索引,无法读取时返回None
+def scanHeader(catalog: Optional[Catalog], imgDir: str, stat: Tuple[int, int]):
+    try:
+        header = static.getHeaderInfo(static.getDcmHeader(imgDir))
+    except Exception:
+        return None
+    if catalog:
+        catalog.put(imgDir, stat, header)
+    return header
@@ -1,3 +1,5 @@
+import os
+
 class Config(object):
     def __init__(self):
         # Font Size
@@ -50,12 +52,83 @@ class Config(object):
         self.eps = 1e-5
         self.base = 2 ** 7
 
+        # Pixel
+        # 分块遍历像素时每块的元素个数
+        self.chunkSize = 2 ** 16
+        # 未压缩的像素数据直接映射文件,不读入内存
+        self.memoryMap = True
+        # 读取文件头时超过该字节数的元素延迟读取,用于定位像素数据
+        self.deferSize = 2 ** 10
+        # 大图全分辨率转换完成前先显示的预览的最大边长(像素)
+        self.previewSize = 2 ** 10
+        # 拖动一个屏幕像素时窗宽窗位变化的比例(相对当前窗宽)
+        self.windowSensitivity = 1 / 256
+        # 图片金字塔每块的边长(像素)
+        self.tileSize = 256
+        # 已生成的块的字节数上限
+        self.tileCacheCapacity = 2 ** 27
+        # 鼠标移动引起的重绘最短间隔(毫秒),约为一帧
+        self.updateInterval = 16
+        # 状态栏坐标的最短刷新间隔(毫秒)
+        self.statusInterval = 100
+
+        # Autosave
+        # 修改后延迟写入的毫秒数
+        self.autosaveInterval = 500
+        # 修改记录超过该条数时合并成完整标注
+        self.journalLimit = 2 ** 12
+
+        # Series
+        # 已解码图片缓存的字节数上限
+        self.cacheCapacity = 2 ** 29
+        # 当前图片前后各预读的张数
+        self.prefetchCount = 2
+        # 后台读取文件头时每批的文件数
+        self.headerBatchSize = 64
+
+        # Catalog
+        # dcm文件头与缩略图的本地索引
+        self.catalogDir = os.path.join(os.path.expanduser('~'), '.labeldcm', 'catalog.sqlite3')
+        # 索引被其他线程写入时等待的秒数
+        self.catalogTimeout = 2
+        # 每次按路径查询的记录数,不超过sqlite的参数个数上限
+        self.catalogQuerySize = 512
+        # 在索引中搜索时最多列出的文件数
+        self.catalogSearchLimit = 10000
+        # 缩略图的最大边长(像素)
+        self.thumbnailSize = 48
+
+        # Export
+        # 同时导出的图片数,每张占用一张原图大小的图片
+        self.exportThreads = 4
+        # JPEG的质量与PNG的压缩程度(0~100),-1为Qt的默认值
+        self.exportQuality = -1
+        # TIFF默认的压缩方式,0为不压缩,1为LZW,批量导出时可以另选
+        self.exportCompression = 1
+        # 批量导出时按该画布尺寸(宽, 高)显示原图的比例放大标记
+        self.exportViewSize = (1600, 900)
+        # 批量导出的格式
+        self.exportExts = ['.png', '.jpg', '.tif']
+
+        # Frame
+        # 多帧图片当前帧附近缓存的帧数
+        self.frameBufferSize = 16
+        # 没有帧率信息时的播放间隔(毫秒)
+        self.cineInterval = 100
+
         # Debug
         self.debug = True
+        # 为True时记录各阶段耗时并在状态栏显示帧率,默认关闭
+        # 也可以用--profile, --trace或环境变量LABELDCM_PROFILE=1打开
+        self.profiling = False
+        # 耗时记录的环形缓冲区长度
+        self.profileSize = 2 ** 14
+        # 状态栏耗时统计的刷新间隔(毫秒)
+        self.profileInterval = 500
 
         # 操作列表
         self.defaultAction = '无操作'
-        self.actionList = ['无操作', '点', '线', '角度', '圆', '中点', '直角', '移动点', '删除点']
+        self.actionList = ['无操作', '点', '线', '角度', '圆', '中点', '直角', '移动点', '删除点', '窗宽窗位']
 
     def __setattr__(self, key, value):
         if key in self.__dict__:
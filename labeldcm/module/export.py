@@ -0,0 +1,189 @@
+from labeldcm.module import annotation, static
+from labeldcm.module.config import config
+from labeldcm.module.frames import FrameBuffer
+from labeldcm.module.item import AngleItem, CircleItem, getAngleStates, getCircleStates, getLineStates, LabelItem, \
+    LineItem, PointItem
+from labeldcm.module.series import isDcmDir
+from labeldcm.module.store import FrameStores, LabelStore
+from labeldcm.module.window import getPixelWindow
+import os
+from pydicom import dcmread
+from PyQt5.QtCore import pyqtSignal, QObject, QPointF, QRunnable, QSize, Qt, QThreadPool
+from PyQt5.QtGui import QColor, QImage, QImageWriter, QPainter
+from typing import List, Optional, Tuple
+
+# 导出格式:扩展名 -> (Qt的格式名, 是否为16 Bit)
+exportFormats = {
+    '.png': ('PNG', False),
+    '.jpg': ('JPEG', False),
+    '.jpeg': ('JPEG', False),
+    '.jpe': ('JPEG', False),
+    '.tif': ('TIFF', True),
+    '.tiff': ('TIFF', True)
+}
+
+def getExportFormat(outDir: str):
+    ext = os.path.splitext(outDir)[1].lower()
+    if ext not in exportFormats:
+        raise ValueError(f'Unsupported export format {ext}!')
+    return exportFormats[ext]
+
+# 没有画布时标记的放大倍数:按config.exportViewSize显示原图时的 原图像素 / 屏幕像素
+def getExportScale(width: int, height: int):
+    view = QSize(width, height).scaled(QSize(*config.exportViewSize), Qt.KeepAspectRatio)
+    return width / max(view.width(), 1)
+
+# 批量导出时的文件名,多帧图片的其余帧加上帧号
+def getExportDir(imgDir: str, folderDir: str, frame: int, ext: str):
+    name = os.path.splitext(os.path.basename(imgDir))[0]
+    return os.path.join(folderDir, (f'{name}_{frame}' if frame else name) + ext)
+
+# 原图按窗宽窗位转换后的QImage,isDeep为True时每通道16 Bit,window为空时使用默认窗宽窗位
+def getExportImg(imgDir: str, frame: int, isDeep: bool, window: Optional[Tuple[float, float]] = None):
+    if isDcmDir(imgDir):
+        dcm = dcmread(imgDir, stop_before_pixels=True)
+        raw = static.getRawFrame(imgDir, frame)
+        if pixelWindow := getPixelWindow(dcm, raw):
+            if window:
+                pixelWindow.setWindow(*window)
+            mat = static.applyLut(pixelWindow.getLut16() if isDeep else pixelWindow.getLut(), raw)
+        else:
+            mat = FrameBuffer().render(raw)
+        img = static.toQImage(mat)
+    else:
+        img = QImage(imgDir)
+        if img.isNull():
+            raise ValueError('The image file can not be decoded!')
+    return img.convertToFormat(QImage.Format_RGBX64 if isDeep else QImage.Format_RGB32)
+
+# 按原图坐标绘制一帧的标注,标记大小为屏幕像素 * scale
+# 图元只用于绘制,不加入画布,可以在工作线程中调用
+def drawLabels(painter: QPainter, store: LabelStore, scale: float):
+    palette = [QColor(color) for color in config.colorList]
+    items: List[LabelItem] = []
+    for index in sorted(store.getIndexs()):
+        item = PointItem()
+        item.setPoint(QPointF(*store.getPoint(index)), index, palette[store.getPointColor(index)])
+        items.append(item)
+    for key, A, B, M, offset, text in getLineStates(store, list(store.lines)):
+        item = LineItem()
+        item.setLine(A, B, M, offset, text, palette[store.lines.getColor(key)])
+        items.append(item)
+    for key, rect, begin, degree, F, offset, text in getAngleStates(store, list(store.angles)):
+        item = AngleItem()
+        item.setAngle(rect, begin, degree, F, offset, text, palette[store.angles.getColor(key)])
+        items.append(item)
+    for key, rect in getCircleStates(store, list(store.circles)):
+        item = CircleItem()
+        item.setCircle(rect, palette[store.circles.getColor(key)])
+        items.append(item)
+    painter.setRenderHint(QPainter.Antialiasing, True)
+    for item in items:
+        item.export(painter, scale)
+
+# quality为-1时使用Qt的默认值,compression为TIFF的压缩方式
+def writeImg(img: QImage, outDir: str, quality: int, compression: int):
+    name, _ = getExportFormat(outDir)
+    writer = QImageWriter(outDir, name.encode())
+    writer.setQuality(quality)
+    if name == 'TIFF':
+        writer.setCompression(compression)
+    if not writer.write(img):
+        raise OSError(f'{outDir}: {writer.errorString()}')
+
+# exported为导出的文件,finished在每个任务结束时发出
+class ExportSignals(QObject):
+    exported = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+    finished = pyqtSignal()
+
+# 在线程池中读取原图,绘制标注并写入文件,只使用QImage
+# labels不为空时导出第frame帧的这份标注到outDir,否则读取标注文件,把每个有标注的帧导出到文件夹outDir
+class ExportTask(QRunnable):
+    def __init__(self, imgDir: str, outDir: str, quality: int = -1, frame: int = 0, labels: Optional[dict] = None,
+                 window: Optional[Tuple[float, float]] = None, scale: Optional[float] = None, ext: str = '.png',
+                 compression: int = config.exportCompression):
+        super(ExportTask, self).__init__()
+        self.imgDir = imgDir
+        self.outDir = outDir
+        self.quality = quality
+        self.compression = compression
+        self.frame = frame
+        self.labels = labels
+        self.window = window
+        self.scale = scale
+        self.ext = ext
+        self.signals = ExportSignals()
+
+    # [(帧号, 标注, 导出的文件)]
+    def getJobs(self):
+        if self.labels is not None:
+            store = LabelStore()
+            annotation.fromFrameDict(store, self.labels)
+            return [(self.frame, store, self.outDir)]
+        stores = FrameStores()
+        annotation.loadAnnotation(self.imgDir, stores)
+        return [(frame, store, getExportDir(self.imgDir, self.outDir, frame, self.ext))
+                for frame, store in stores if len(store)]
+
+    def export(self, frame: int, store: LabelStore, outDir: str):
+        img = getExportImg(self.imgDir, frame, getExportFormat(outDir)[1], self.window)
+        painter = QPainter()
+        painter.begin(img)
+        drawLabels(painter, store, self.scale or getExportScale(img.width(), img.height()))
+        painter.end()
+        writeImg(img, outDir, self.quality, self.compression)
+
+    def run(self):
+        try:
+            for frame, store, outDir in self.getJobs():
+                self.export(frame, store, outDir)
+                self.signals.exported.emit(outDir)
+        except Exception as e:
+            self.signals.failed.emit(self.imgDir, str(e))
+        self.signals.finished.emit()
+
+# 导出任务的线程池,一批任务全部结束后发出finished(导出的文件数, 失败的图片数)
+class ExportEngine(QObject):
+    exported = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super(ExportEngine, self).__init__(parent)
+        # 每个任务同时持有一张原图大小的QImage,线程数同时限制内存
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(config.exportThreads)
+        self.pending = 0
+        self.exportCount = 0
+        self.failCount = 0
+
+    def isBusy(self):
+        return self.pending > 0
+
+    def start(self, tasks: List[ExportTask]):
+        for task in tasks:
+            task.signals.exported.connect(self.handleExported)
+            task.signals.failed.connect(self.handleFailed)
+            task.signals.finished.connect(self.handleFinished)
+            self.pending += 1
+            self.pool.start(task)
+
+    def handleExported(self, outDir: str):
+        self.exportCount += 1
+        self.exported.emit(outDir)
+
+    def handleFailed(self, imgDir: str, text: str):
+        self.failCount += 1
+        self.failed.emit(imgDir, text)
+
+    def handleFinished(self):
+        self.pending -= 1
+        if self.pending:
+            return None
+        self.finished.emit(self.exportCount, self.failCount)
+        self.exportCount = 0
+        self.failCount = 0
+
+    def wait(self):
+        self.pool.waitForDone()
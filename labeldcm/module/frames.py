@@ -0,0 +1,70 @@
+from labeldcm.module import static
+from labeldcm.module.config import config
+from labeldcm.module.window import PixelWindow
+import numpy
+from typing import Callable, Dict, Optional
+
+# 一张图片的原始像素:帧数,帧间隔,窗宽窗位,以及当前帧附近已解码的帧
+# 超出容量时丢弃离当前帧最远的帧,第0帧始终保留,播放时首尾相接
+class FrameBuffer(object):
+    def __init__(self, count: int = 1, interval: float = 0, window: Optional[PixelWindow] = None):
+        self.count = count
+        # 帧间隔(毫秒)
+        self.interval = interval
+        # 各帧共用同一窗宽窗位,为空时按每帧的最小最大值拉伸
+        self.window = window
+        self.current = 0
+        self.frames: Dict[int, numpy.ndarray] = {}
+        # 已解码的帧增减后调用,用于更新缓存的字节数
+        self.resized: Optional[Callable[[], None]] = None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, index: int):
+        return index in self.frames
+
+    def get(self, index: int):
+        return self.frames.get(index)
+
+    # 映射文件的帧由系统按页缓存,不计入
+    def getBytes(self):
+        return sum(frame.nbytes for frame in self.frames.values() if not isinstance(frame, numpy.memmap))
+
+    def getDistance(self, index: int):
+        distance = abs(index - self.current)
+        return min(distance, self.count - distance)
+
+    def put(self, index: int, frame: numpy.ndarray):
+        self.frames[index] = frame
+        while len(self.frames) > max(config.frameBufferSize, 1):
+            del self.frames[max((i for i in self.frames if i), key=self.getDistance)]
+        self.notifyResized()
+
+    # 离开图片时只保留第0帧
+    def trim(self):
+        self.current = 0
+        for index in [index for index in self.frames if index]:
+            del self.frames[index]
+        self.notifyResized()
+
+    def notifyResized(self):
+        if self.resized:
+            self.resized()
+
+    # 当前帧前后需要解码的帧,之后的帧优先
+    def getNeighbors(self):
+        neighbors = []
+        for step in range(config.frameBufferSize // 2):
+            for index in ((self.current + step) % self.count, (self.current - step) % self.count):
+                if index not in neighbors:
+                    neighbors.append(index)
+        return neighbors
+
+    # 原始像素 -> 8 Bit
+    def render(self, frame: numpy.ndarray):
+        if self.window:
+            return self.window.render(frame)
+        if frame.dtype == numpy.uint8:
+            return frame
+        return static.toUint8(frame, *static.getMinMax(frame))
@@ -0,0 +1,62 @@
+import math
+from typing import Dict, Set, Tuple
+
+# 均匀网格,格子边长不小于查找半径时只需检查相邻的3x3个格子
+class PointGrid(object):
+    def __init__(self, cellSize: float):
+        self.cellSize = cellSize
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.coords: Dict[int, Tuple[float, float]] = {}
+
+    def getCell(self, x: float, y: float):
+        return math.floor(x / self.cellSize), math.floor(y / self.cellSize)
+
+    # 改变格子边长并重建
+    def setCellSize(self, cellSize: float):
+        if cellSize == self.cellSize:
+            return None
+        coords = list(self.coords.items())
+        self.cellSize = cellSize
+        self.clear()
+        for index, (x, y) in coords:
+            self.add(index, x, y)
+
+    def clear(self):
+        self.cells.clear()
+        self.coords.clear()
+
+    def add(self, index: int, x: float, y: float):
+        if index in self.coords:
+            self.remove(index)
+        self.coords[index] = x, y
+        self.cells.setdefault(self.getCell(x, y), set()).add(index)
+
+    def remove(self, index: int):
+        if index not in self.coords:
+            return None
+        cell = self.getCell(*self.coords.pop(index))
+        self.cells[cell].discard(index)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def move(self, index: int, x: float, y: float):
+        if index in self.coords and self.getCell(*self.coords[index]) == self.getCell(x, y):
+            self.coords[index] = x, y
+        else:
+            self.add(index, x, y)
+
+    # 半径内最近的点,不存在时返回-1
+    def getNearest(self, x: float, y: float, radius: float):
+        span = math.ceil(radius / self.cellSize)
+        cellX, cellY = self.getCell(x, y)
+        distance = radius * radius
+        index = -1
+        for i in range(cellX - span, cellX + span + 1):
+            for j in range(cellY - span, cellY + span + 1):
+                for idx in self.cells.get((i, j), ()):
+                    ptX, ptY = self.coords[idx]
+                    dis = (ptX - x) * (ptX - x) + (ptY - y) * (ptY - y)
+                    if dis < distance:
+                        distance = dis
+                        index = idx
+        return index
@@ -0,0 +1,219 @@
+from labeldcm.module import static
+from labeldcm.module.config import config
+from labeldcm.module.store import LabelStore
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QPainter, QPen
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
+from typing import List, Optional, Tuple
+
+# scale为空时画笔宽度为屏幕像素,否则为原图像素宽度 = 屏幕像素宽度 * scale
+def getPen(width: float, color: QColor, scale: Optional[float] = None):
+    pen = QPen(color)
+    pen.setCapStyle(Qt.RoundCap)
+    if scale:
+        pen.setWidthF(width * scale)
+    else:
+        pen.setWidthF(width)
+        pen.setCosmetic(True)
+    return pen
+
+def getFont():
+    font = QFont(config.fontFamily)
+    font.setPointSizeF(config.fontSize)
+    return font
+
+# 文本以pos为基线左端点时的外接矩形
+def getTextRect(font: QFont, pos: QPointF, text: str):
+    return QFontMetricsF(font).boundingRect(text).translated(pos).adjusted(-1, -1, 1, 1)
+
+# 由标注批量计算keys对应的线:(key, A, B, 中点, 文本偏移, 距离文本)
+def getLineStates(store: LabelStore, keys: List[Tuple[int, int]]):
+    coords = store.getCoords(store.lines, keys)
+    A, B = coords[:, 0], coords[:, 1]
+    items = zip(keys, A.tolist(), B.tolist(), static.getMidpoints(A, B).tolist(),
+                static.getDistanceShifts(A, B).tolist(), static.getDistances(A, B).tolist())
+    return [(key, QPointF(*A), QPointF(*B), QPointF(*M), QPointF(*offset), str(round(distance, 2)))
+            for key, A, B, M, offset, distance in items]
+
+# 角度:(key, 圆弧外接矩形, 起始角度, 角度, 圆弧中点, 文本偏移, 角度文本)
+def getAngleStates(store: LabelStore, keys: List[Tuple[int, int, int]]):
+    coords = store.getCoords(store.angles, keys)
+    A, B, C = coords[:, 0], coords[:, 1], coords[:, 2]
+    F = static.getArcMidpoints(A, B, C)
+    items = zip(keys, static.getArcRects(A, B, C).tolist(), static.getBeginDegrees(A, B, C).tolist(),
+                static.getDegrees(A, B, C).tolist(), F.tolist(), static.getDegreeShifts(B, F).tolist())
+    return [(key, QRectF(*rect), begin, degree, QPointF(*F), QPointF(*offset), str(round(degree, 2)) + '°')
+            for key, rect, begin, degree, F, offset in items]
+
+# 圆:(key, 外接矩形)
+def getCircleStates(store: LabelStore, keys: List[Tuple[int, int]]):
+    coords = store.getCoords(store.circles, keys)
+    rects = static.getMinBoundingRects(coords[:, 0], coords[:, 1]).tolist()
+    return [(key, QRectF(*rect)) for key, rect in zip(keys, rects)]
+
+# 原图坐标下的标注,画笔宽度不随缩放变化
+class LabelItem(QGraphicsItem):
+    # 原图像素 / 屏幕像素,只用于估计外接矩形的边距
+    unit = 1
+
+    def __init__(self, zValue: int, parent: Optional[QGraphicsItem] = None):
+        super(LabelItem, self).__init__(parent)
+        self.setZValue(zValue)
+        self.font = getFont()
+        self.state: Optional[tuple] = None
+        self.rect = QRectF()
+
+    # 状态不变时不触发重绘
+    def setState(self, *state):
+        if state == self.state:
+            return None
+        self.prepareGeometryChange()
+        self.state = state
+        self.rect = self.getRect()
+        self.update()
+
+    # LabelItem.unit变化后边距随之变化,状态不变也要重新计算外接矩形
+    def updateRect(self):
+        if self.state is None:
+            return None
+        self.prepareGeometryChange()
+        self.rect = self.getRect()
+
+    def getRect(self):
+        return QRectF()
+
+    def getMargin(self, width: float):
+        return width * LabelItem.unit
+
+    # scale为空时绘制到屏幕,否则按原图尺寸导出
+    def draw(self, painter: QPainter, scale: Optional[float] = None):
+        pass
+
+    def export(self, painter: QPainter, scale: float):
+        self.draw(painter, scale)
+        for child in self.childItems():
+            if isinstance(child, LabelItem):
+                child.export(painter, scale)
+
+    def boundingRect(self):
+        return self.rect
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        self.draw(painter)
+
+# 大小不随缩放变化的标注,局部坐标为屏幕像素,原点位于锚点,导出时整体放大scale倍
+class MarkItem(LabelItem):
+    def __init__(self, zValue: int, parent: Optional[QGraphicsItem] = None):
+        super(MarkItem, self).__init__(zValue, parent)
+        self.setFlag(QGraphicsItem.ItemIgnoresTransformations, True)
+
+    def drawMark(self, painter: QPainter):
+        pass
+
+    def draw(self, painter: QPainter, scale: Optional[float] = None):
+        if not scale:
+            self.drawMark(painter)
+            return None
+        painter.save()
+        painter.translate(self.scenePos())
+        painter.scale(scale, scale)
+        self.drawMark(painter)
+        painter.restore()
+
+# 文本,offset为基线左端点相对锚点的屏幕像素偏移
+class TextItem(MarkItem):
+    def __init__(self, parent: QGraphicsItem):
+        super(TextItem, self).__init__(0, parent)
+
+    def setText(self, A: QPointF, offset: QPointF, text: str, color: QColor):
+        self.setPos(A)
+        self.setState(QPointF(offset), text, QColor(color))
+
+    def getRect(self):
+        offset, text, _ = self.state
+        return getTextRect(self.font, offset, text)
+
+    def drawMark(self, painter: QPainter):
+        offset, text, color = self.state
+        painter.setPen(getPen(1, color, 1))
+        painter.setFont(self.font)
+        painter.drawText(offset, text)
+
+class PointItem(MarkItem):
+    def __init__(self):
+        super(PointItem, self).__init__(1)
+
+    def setPoint(self, A: QPointF, index: int, color: QColor):
+        self.setPos(A)
+        self.setState(index, QColor(color))
+
+    def getRect(self):
+        index, _ = self.state
+        r = config.pointWidth
+        return QRectF(-r, -r, 2 * r, 2 * r).united(getTextRect(self.font, static.getIndexShift(QPointF()), str(index)))
+
+    def drawMark(self, painter: QPainter):
+        index, color = self.state
+        painter.setPen(getPen(config.pointWidth, color, 1))
+        painter.setFont(self.font)
+        painter.drawPoint(QPointF())
+        painter.drawText(static.getIndexShift(QPointF()), str(index))
+
+# 几何量由static中的批量函数预先算好,绘制时不再逐个计算
+class LineItem(LabelItem):
+    def __init__(self):
+        super(LineItem, self).__init__(2)
+        self.text = TextItem(self)
+
+    def setLine(self, A: QPointF, B: QPointF, M: QPointF, offset: QPointF, text: str, color: QColor):
+        self.setState(QPointF(A), QPointF(B), QColor(color))
+        self.text.setText(M, offset, text, color)
+
+    def getRect(self):
+        A, B, _ = self.state
+        r = self.getMargin(config.lineWidth)
+        return QRectF(A, B).normalized().adjusted(-r, -r, r, r)
+
+    def draw(self, painter: QPainter, scale: Optional[float] = None):
+        A, B, color = self.state
+        painter.setPen(getPen(config.lineWidth, color, scale))
+        painter.drawLine(A, B)
+
+# rect为圆弧的外接矩形,begin与span为角度
+# 角度数值锚定在圆弧中点F(原图坐标),offset为相对F的屏幕像素偏移,与缩放无关
+class AngleItem(LabelItem):
+    def __init__(self):
+        super(AngleItem, self).__init__(3)
+        self.text = TextItem(self)
+
+    def setAngle(self, rect: QRectF, begin: float, span: float, F: QPointF, offset: QPointF, text: str, color: QColor):
+        self.setState(QRectF(rect), int(begin * 16), int(span * 16), QColor(color))
+        self.text.setText(F, offset, text, color)
+
+    def getRect(self):
+        rect, _, _, _ = self.state
+        r = self.getMargin(config.angleWidth)
+        return rect.adjusted(-r, -r, r, r)
+
+    def draw(self, painter: QPainter, scale: Optional[float] = None):
+        rect, begin, span, color = self.state
+        painter.setPen(getPen(config.angleWidth, color, scale))
+        painter.drawArc(rect, begin, span)
+
+class CircleItem(LabelItem):
+    def __init__(self):
+        super(CircleItem, self).__init__(4)
+
+    def setCircle(self, rect: QRectF, color: QColor):
+        self.setState(QRectF(rect), QColor(color))
+
+    def getRect(self):
+        rect, _ = self.state
+        r = self.getMargin(config.lineWidth)
+        return rect.adjusted(-r, -r, r, r)
+
+    def draw(self, painter: QPainter, scale: Optional[float] = None):
+        rect, color = self.state
+        painter.setPen(getPen(config.lineWidth, color, scale))
+        painter.drawEllipse(rect)
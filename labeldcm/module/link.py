@@ -0,0 +1,24 @@
+from typing import Dict, Set, Tuple
+
+# 点标号 -> 引用该点的线、角度或圆的标号
+class LinkIndex(object):
+    def __init__(self):
+        self.links: Dict[int, Set[Tuple[int, ...]]] = {}
+
+    def clear(self):
+        self.links.clear()
+
+    def add(self, key: Tuple[int, ...]):
+        for index in key:
+            self.links.setdefault(index, set()).add(key)
+
+    def remove(self, key: Tuple[int, ...]):
+        for index in key:
+            if index in self.links:
+                self.links[index].discard(key)
+                if not self.links[index]:
+                    del self.links[index]
+
+    # 返回副本,调用方可以边遍历边修改
+    def get(self, index: int):
+        return set(self.links.get(index, ()))
@@ -0,0 +1,188 @@
+from labeldcm.module import static
+from labeldcm.module.catalog import Catalog, getChanges, openCatalog, scanHeader
+from labeldcm.module.config import config
+from labeldcm.module.frames import FrameBuffer
+from labeldcm.module.profiler import profiler
+from labeldcm.module.window import getPixelWindow
+from pydicom import dcmread
+from PyQt5.QtCore import pyqtSignal, QObject, QRunnable, QSize, Qt
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader
+import sqlite3
+from typing import List, Optional
+
+# 加载结果通过信号回到GUI线程,imgDir用于区分当前图片与预读的图片
+# loaded的第二项为QImage或8 Bit的numpy图,numpy图在GUI线程直接包装后转为QPixmap
+# loaded的最后一项为FrameBuffer,保留第0帧的原始像素用于调整窗宽窗位
+# preview为大图在全分辨率转换完成前的缩小预览,后两项为原图宽高
+# header为解码像素前读到的病人ID,姓名,检查日期与检查类型,只用于加载时的状态栏
+class LoaderSignals(QObject):
+    progress = pyqtSignal(str, int, str)
+    header = pyqtSignal(str, str)
+    preview = pyqtSignal(str, object, str, int, int)
+    loaded = pyqtSignal(str, object, str, object)
+    failed = pyqtSignal(str, str)
+
+# 超过config.previewSize两倍的图片先显示的预览尺寸,不需要预览时返回None
+def getPreviewSize(width: int, height: int):
+    if max(width, height) <= config.previewSize * 2:
+        return None
+    size = QSize(width, height).scaled(config.previewSize, config.previewSize, Qt.KeepAspectRatio)
+    return max(size.width(), 1), max(size.height(), 1)
+
+# 在线程池中读取图片,QPixmap只能在GUI线程创建,这里只产出QImage或numpy图
+class ImgLoader(QRunnable):
+    def __init__(self, imgDir: str, isDcm: bool):
+        super(ImgLoader, self).__init__()
+        self.imgDir = imgDir
+        self.isDcm = isDcm
+        self.cancelled = False
+        self.signals = LoaderSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    # 多帧图片只解码第0帧,其余帧在切换时由FrameLoader解码
+    def loadDcm(self):
+        self.signals.progress.emit(self.imgDir, 10, '读取文件')
+        dcm = dcmread(self.imgDir, stop_before_pixels=True)
+        if self.cancelled:
+            return None
+        self.signals.header.emit(self.imgDir, ' '.join(value for value in static.getHeaderInfo(dcm).values() if value))
+        mdInfo = static.getMdInfo(dcm)
+        self.signals.progress.emit(self.imgDir, 40, '解码像素')
+        with profiler.stage('decode'):
+            raw = static.getRawFrame(self.imgDir, 0)
+        if self.cancelled:
+            return None
+        self.signals.progress.emit(self.imgDir, 70, '转换图片')
+        frames = FrameBuffer(static.getFrameCount(dcm), static.getFrameInterval(dcm), getPixelWindow(dcm, raw))
+        frames.put(0, raw)
+        # 按步长采样查表,映射文件时只读取采样到的行
+        if frames.window and (size := getPreviewSize(raw.shape[1], raw.shape[0])):
+            with profiler.stage('preview'):
+                preview = frames.window.renderPreview(raw, *size).copy()
+            if self.cancelled:
+                return None
+            self.signals.preview.emit(self.imgDir, preview, mdInfo, raw.shape[1], raw.shape[0])
+        with profiler.stage('render'):
+            mat = frames.render(raw)
+        if self.cancelled:
+            return None
+        self.signals.loaded.emit(self.imgDir, mat, mdInfo, frames)
+
+    # JPEG可以在解码时直接缩小,先解码预览
+    def loadImg(self):
+        self.signals.progress.emit(self.imgDir, 10, '读取文件')
+        reader = QImageReader(self.imgDir)
+        width, height = reader.size().width(), reader.size().height()
+        if reader.supportsOption(QImageIOHandler.ScaledSize) and (size := getPreviewSize(width, height)):
+            reader.setScaledSize(QSize(*size))
+            with profiler.stage('preview'):
+                preview = reader.read()
+            if self.cancelled:
+                return None
+            if not preview.isNull():
+                self.signals.preview.emit(self.imgDir, preview, '', width, height)
+        img = QImage(self.imgDir)
+        if self.cancelled:
+            return None
+        if img.isNull():
+            self.signals.failed.emit(self.imgDir, 'The image file can not be decoded!')
+        else:
+            self.signals.loaded.emit(self.imgDir, img, '', FrameBuffer())
+
+    def run(self):
+        if self.cancelled:
+            return None
+        try:
+            if self.isDcm:
+                self.loadDcm()
+            else:
+                self.loadImg()
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.imgDir, f'The image file can not be decoded!\n{e}')
+
+# loaded的最后一项为该帧的原始像素
+class FrameSignals(QObject):
+    loaded = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+
+# 在线程池中解码多帧图片的一帧,转换为8 Bit在GUI线程按当前窗宽窗位进行
+class FrameLoader(QRunnable):
+    def __init__(self, imgDir: str, index: int):
+        super(FrameLoader, self).__init__()
+        self.imgDir = imgDir
+        self.index = index
+        self.cancelled = False
+        self.signals = FrameSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return None
+        try:
+            with profiler.stage('decode'):
+                frame = static.getRawFrame(self.imgDir, self.index)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.imgDir, self.index, f'The frame can not be decoded!\n{e}')
+            return None
+        if not self.cancelled:
+            self.signals.loaded.emit(self.imgDir, self.index, frame)
+
+# loaded为[(imgDir, 文件头, 缩略图)],索引中未变化的文件一次发出,其余每读完config.headerBatchSize个文件发出一次
+# 缩略图为PNG数据,没有时为None
+class HeaderSignals(QObject):
+    loaded = pyqtSignal(list)
+
+# 在线程池中只读取文件列表中dcm文件的文件头,不读取像素数据,无法读取的文件跳过
+# 修改时间与大小和索引中一致的文件直接使用索引中的记录,folderDir不为空时同时清理该文件夹中已删除文件的记录
+class HeaderLoader(QRunnable):
+    def __init__(self, imgDirs: List[str], folderDir: Optional[str] = None):
+        super(HeaderLoader, self).__init__()
+        self.imgDirs = imgDirs
+        self.folderDir = folderDir
+        self.cancelled = False
+        self.signals = HeaderSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def scan(self, catalog: Optional[Catalog]):
+        changed = [(imgDir, None) for imgDir in self.imgDirs]
+        if catalog:
+            fresh, changed, missing = getChanges(catalog, self.imgDirs)
+            catalog.remove(missing)
+            if self.folderDir:
+                catalog.prune(self.folderDir, self.imgDirs)
+            catalog.commit()
+            if fresh and not self.cancelled:
+                self.signals.loaded.emit(fresh)
+        headers = []
+        for imgDir, stat in changed:
+            if self.cancelled:
+                break
+            if (header := scanHeader(catalog, imgDir, stat)) is not None:
+                headers.append((imgDir, header, None))
+            if len(headers) >= config.headerBatchSize:
+                if catalog:
+                    catalog.commit()
+                self.signals.loaded.emit(headers)
+                headers = []
+        if catalog:
+            catalog.commit()
+        if headers and not self.cancelled:
+            self.signals.loaded.emit(headers)
+
+    def run(self):
+        catalog = openCatalog()
+        try:
+            self.scan(catalog)
+        except sqlite3.Error:
+            return None
+        finally:
+            if catalog:
+                catalog.close()
@@ -10,3 +10,4 @@ class LabelMode(Enum):
     VerticalMode = 6
     MovePointMode = 7
     ClearPointMode = 8
+    WindowMode = 9
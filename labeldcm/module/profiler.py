@@ -0,0 +1,111 @@
+from collections import deque
+from contextlib import contextmanager
+from labeldcm.module.config import config
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# 各阶段耗时的环形缓冲区,记录为(阶段, 开始时间, 耗时, 线程),时间单位为秒
+# 默认关闭,关闭时stage与timed只多一次判断
+class Profiler(object):
+    def __init__(self, size: int, enabled: bool):
+        self.enabled = enabled
+        self.records: Deque[Tuple[str, float, float, int]] = deque(maxlen=size)
+        # 画布每次重绘的时间,用于计算帧率
+        self.frames: Deque[float] = deque(maxlen=size)
+        self.origin = time.perf_counter()
+        self.profile: Optional[cProfile.Profile] = None
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.frames.clear()
+
+    # with profiler.stage(name): ...
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.records.append((name, start, time.perf_counter() - start, threading.get_ident()))
+
+    # 装饰器,name为空时使用函数名
+    def timed(self, name: Optional[str] = None):
+        def decorator(func: Callable):
+            stageName = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stageName):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def addFrame(self):
+        if self.enabled:
+            with self.lock:
+                self.frames.append(time.perf_counter())
+
+    # 最近span秒内的帧率
+    def getFps(self, span: float = 1):
+        now = time.perf_counter()
+        with self.lock:
+            return sum(1 for frame in self.frames if now - frame <= span) / span
+
+    # 最近span秒内各阶段的(次数, 平均耗时, 最大耗时),耗时单位为毫秒
+    def getStats(self, span: float = 1):
+        now = time.perf_counter()
+        with self.lock:
+            records = [record for record in self.records if now - record[1] <= span]
+        durations: Dict[str, List[float]] = {}
+        for name, _, duration, _ in records:
+            durations.setdefault(name, []).append(duration * 1000)
+        return {name: (len(values), sum(values) / len(values), max(values)) for name, values in durations.items()}
+
+    # 状态栏显示的帧率与各阶段平均/最大耗时
+    def getSummary(self, span: float = 1):
+        texts = [f'FPS: {round(self.getFps(span))}']
+        for name, (_, mean, upp) in sorted(self.getStats(span).items()):
+            texts.append(f'{name}: {mean:.1f}/{upp:.1f}ms')
+        return ' | '.join(texts)
+
+    # cProfile只统计GUI线程
+    def startProfile(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stopProfile(self, profileDir: str):
+        if not self.profile:
+            return None
+        self.profile.disable()
+        self.profile.dump_stats(profileDir)
+        self.profile = None
+
+    # Chrome Trace Event格式,可在chrome://tracing或Perfetto中打开
+    def dumpTrace(self, traceDir: str):
+        pid = os.getpid()
+        with self.lock:
+            records = list(self.records)
+            frames = list(self.frames)
+        events = [{
+            'name': name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6
+        } for name, start, duration, tid in records]
+        events += [{
+            'name': 'frame', 'cat': 'frame', 'ph': 'i', 's': 'p', 'pid': pid, 'tid': 0, 'ts': (frame - self.origin) * 1e6
+        } for frame in frames]
+        with open(traceDir, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# config.profiling或环境变量LABELDCM_PROFILE打开记录
+profiler = Profiler(config.profileSize, config.profiling or os.getenv('LABELDCM_PROFILE', '') not in ('', '0'))
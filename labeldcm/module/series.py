@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from labeldcm.module.config import config
+from labeldcm.module.frames import FrameBuffer
+from PyQt5.QtGui import QPixmap
+from typing import Dict, List, Optional, Set, Tuple
+import os
+
+dcmExts = ('.dcm',)
+imgExts = ('.jpg', '.jpeg', '.jpe', '.png')
+
+def isDcmDir(imgDir: str):
+    return imgDir.lower().endswith(dcmExts)
+
+# 文件夹内可以打开的图片,按文件名排序
+def getImgDirs(folderDir: str):
+    imgDirs = []
+    for entry in os.scandir(folderDir):
+        if entry.is_file() and entry.name.lower().endswith(dcmExts + imgExts):
+            imgDirs.append(entry.path)
+    return sorted(imgDirs, key=lambda imgDir: os.path.basename(imgDir).lower())
+
+def getImgBytes(img: QPixmap):
+    return img.width() * img.height() * img.depth() // 8
+
+# 已解码图片的LRU缓存,值为(图片, 病人信息, 原始像素),总字节数不超过capacity
+# 缓存中的多帧图片之后解码的帧通过FrameBuffer.resized计入
+class ImgCache(object):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.items: Dict[str, Tuple[QPixmap, str, FrameBuffer]] = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+
+    def __contains__(self, imgDir: str):
+        return imgDir in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def clear(self):
+        for _, _, frames in self.items.values():
+            frames.resized = None
+        self.items.clear()
+        self.sizes.clear()
+        self.size = 0
+
+    def get(self, imgDir: str):
+        if imgDir not in self.items:
+            return None
+        self.items.move_to_end(imgDir)
+        return self.items[imgDir]
+
+    def put(self, imgDir: str, img: QPixmap, mdInfo: str, frames: FrameBuffer):
+        self.remove(imgDir)
+        if getImgBytes(img) + frames.getBytes() > self.capacity:
+            return None
+        self.items[imgDir] = img, mdInfo, frames
+        self.sizes[imgDir] = 0
+        frames.resized = lambda: self.resize(imgDir)
+        self.resize(imgDir)
+
+    # 重新计算imgDir的字节数,超出容量时从最久未用的开始移除
+    def resize(self, imgDir: str):
+        if imgDir not in self.items:
+            return None
+        img, _, frames = self.items[imgDir]
+        size = getImgBytes(img) + frames.getBytes()
+        self.size += size - self.sizes[imgDir]
+        self.sizes[imgDir] = size
+        while self.size > self.capacity:
+            self.remove(next(iter(self.items)))
+
+    def remove(self, imgDir: str):
+        if imgDir in self.items:
+            _, _, frames = self.items.pop(imgDir)
+            frames.resized = None
+            self.size -= self.sizes.pop(imgDir)
+
+# 一个文件夹内(或在索引中搜索到)的图片列表与当前位置,以及后台读取的dcm文件头
+# thumbnails为索引中已有缩略图的文件
+class Series(object):
+    def __init__(self):
+        self.folderDir: Optional[str] = None
+        self.imgDirs: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.headers: Dict[str, Dict[str, str]] = {}
+        self.thumbnails: Set[str] = set()
+        self.current = -1
+
+    def __len__(self):
+        return len(self.imgDirs)
+
+    def open(self, folderDir: str):
+        self.openList(getImgDirs(folderDir))
+        self.folderDir = folderDir
+
+    # 不属于同一文件夹的图片列表,保持给定的顺序
+    def openList(self, imgDirs: List[str]):
+        self.clear()
+        self.imgDirs = imgDirs
+        self.rows = {imgDir: i for i, imgDir in enumerate(self.imgDirs)}
+
+    def clear(self):
+        self.folderDir = None
+        self.imgDirs = []
+        self.rows.clear()
+        self.headers.clear()
+        self.thumbnails.clear()
+        self.current = -1
+
+    def indexOf(self, imgDir: str):
+        if imgDir in self.rows:
+            return self.rows[imgDir]
+        imgDir = os.path.normcase(os.path.abspath(imgDir))
+        for i, other in enumerate(self.imgDirs):
+            if os.path.normcase(os.path.abspath(other)) == imgDir:
+                return i
+        return -1
+
+    # 文件名或文件头中的病人ID,姓名,检查日期,模态包含text(不区分大小写)
+    def isMatched(self, imgDir: str, text: str):
+        text = text.strip().lower()
+        if not text or text in os.path.basename(imgDir).lower():
+            return True
+        header = self.headers.get(imgDir, {})
+        return any(text in value.lower() for value in header.values())
+
+    # 当前位置前后需要预读的图片,近的优先
+    def getNeighbors(self):
+        neighbors = []
+        for step in range(1, config.prefetchCount + 1):
+            for i in (self.current + step, self.current - step):
+                if 0 <= i < len(self.imgDirs):
+                    neighbors.append(self.imgDirs[i])
+        return neighbors
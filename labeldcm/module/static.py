@@ -2,9 +2,16 @@ from labeldcm.module.config import config
 import math
 import numpy
 import os
-from PIL import Image
-from pydicom import dcmread
-from PyQt5.QtCore import QPointF, QRectF
+from pydicom import dcmread, FileDataset
+from pydicom.dataelem import RawDataElement
+from pydicom.pixels import pixel_array
+from PyQt5 import sip
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QPointF, QRectF, Qt
+from PyQt5.QtGui import QImage, QPixmap
+from typing import Optional
+
+pixelDataTag = 0x7FE00010
+undefinedLength = 0xFFFFFFFF
 
 # 判断文件是否可读
 def isImgAccess(imgDir: str):
@@ -31,14 +38,151 @@ def toAge(age: str):
         return str1 + '天'
     return str1
 
-# 得到dcm文件的qpixmap和包含的信息
-def getDcmImgAndMdInfo(imgDir: str):
-    dcm = dcmread(imgDir)
-    low = numpy.min(dcm.pixel_array)
-    upp = numpy.max(dcm.pixel_array)
-    # 16 Bit -> 8 Bit
-    mat = numpy.floor_divide(dcm.pixel_array, (upp - low + 1) / 256)
-    img = Image.fromarray(mat.astype(numpy.uint8)).toqpixmap()
+# 分块求最小值和最大值,每块在缓存内完成两次归约,整体只遍历一次内存
+def getMinMax(mat: numpy.ndarray):
+    flat = mat.reshape(-1)
+    low = upp = flat[0]
+    for begin in range(0, flat.size, config.chunkSize):
+        chunk = flat[begin:begin + config.chunkSize]
+        low = min(low, chunk.min())
+        upp = max(upp, chunk.max())
+    return low, upp
+
+# 不超过16位的整数像素按原始位模式查表
+def isLutDtype(dtype: numpy.dtype):
+    return dtype.kind in 'ui' and dtype.itemsize <= 2
+
+# 按原始位模式排列的所有像素值,下标即位模式
+def getPatterns(dtype: numpy.dtype):
+    bits = numpy.dtype(f'u{dtype.itemsize}')
+    return numpy.arange(2 ** (8 * dtype.itemsize), dtype=numpy.int64).astype(bits).view(dtype)
+
+# 原始位模式 -> 8 Bit 的查表
+def getUint8Lut(dtype: numpy.dtype, low: int, upp: int):
+    values = getPatterns(dtype).astype(numpy.int64)
+    return ((numpy.clip(values, low, upp) - low) * 256 // (upp - low + 1)).astype(numpy.uint8)
+
+# 分块按原始位模式查表,写入out(为空时新建,类型与lut相同),每块的读写都在缓存内完成
+def applyLut(lut: numpy.ndarray, mat: numpy.ndarray, out: Optional[numpy.ndarray] = None):
+    if out is None:
+        out = numpy.empty(mat.shape, lut.dtype)
+    bits = mat.view(f'u{mat.dtype.itemsize}').reshape(-1)
+    flat = out.reshape(-1)
+    for begin in range(0, bits.size, config.chunkSize):
+        numpy.take(lut, bits[begin:begin + config.chunkSize], out=flat[begin:begin + config.chunkSize])
+    return out
+
+# 16 Bit -> 8 Bit,线性拉伸[low, upp]
+def toUint8(mat: numpy.ndarray, low, upp):
+    if isLutDtype(mat.dtype):
+        return applyLut(getUint8Lut(mat.dtype, int(low), int(upp)), mat)
+    # 32 Bit 整数或浮点数据无法查表
+    return ((mat - low) / ((float(upp) - float(low) + 1) / 256)).astype(numpy.uint8)
+
+# numpy图对应的QImage格式:(dtype, 通道数)
+qImageFormats = {
+    (numpy.dtype(numpy.uint8), 1): QImage.Format_Grayscale8,
+    (numpy.dtype(numpy.uint16), 1): QImage.Format_Grayscale16,
+    (numpy.dtype(numpy.uint8), 3): QImage.Format_RGB888,
+    (numpy.dtype(numpy.uint8), 4): QImage.Format_RGBA8888
+}
+
+# 按行跨度直接包装numpy图,不复制像素
+# QImage不拥有这块内存,mat挂在QImage上保证其存活,mat被改写时QImage随之改变
+def toQImage(mat: numpy.ndarray):
+    channel = 1 if mat.ndim == 2 else mat.shape[2]
+    if (mat.dtype, channel) not in qImageFormats:
+        raise ValueError(f'Unsupported image type {mat.dtype} with {channel} channels!')
+    # 每行内部必须连续,首地址按4字节对齐,行跨度为正且能容纳一行,不满足时复制
+    rowBytes = mat.shape[1] * mat.strides[1] if mat.ndim > 1 else 0
+    if mat.strides[1:] != numpy.empty(mat.shape[1:], mat.dtype).strides or mat.ctypes.data % 4 \
+            or mat.strides[0] < rowBytes:
+        mat = numpy.ascontiguousarray(mat)
+    # 切片得到的数组不连续,memoryview无法传给QImage,直接传入首地址与行跨度
+    img = QImage(sip.voidptr(mat.ctypes.data), mat.shape[1], mat.shape[0], mat.strides[0],
+                 qImageFormats[(mat.dtype, channel)])
+    img.mat = mat
+    return img
+
+# QPixmap.fromImage在GUI线程完成唯一一次复制
+def toQPixmap(mat: numpy.ndarray):
+    return QPixmap.fromImage(toQImage(mat))
+
+# 先快速缩小到缩略图的两倍,再平滑缩小,编码为PNG
+def toThumbnail(img: QPixmap):
+    size = config.thumbnailSize
+    img = img.scaled(size * 2, size * 2, Qt.KeepAspectRatio, Qt.FastTransformation) \
+        .scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    img.save(buffer, 'PNG')
+    return bytes(data)
+
+# 多帧图片的帧数,单帧为1
+def getFrameCount(dcm: FileDataset):
+    return int(dcm.get('NumberOfFrames') or 1)
+
+# 帧间隔(毫秒),依次取FrameTime, CineRate, RecommendedDisplayFrameRate
+def getFrameInterval(dcm: FileDataset):
+    if frameTime := dcm.get('FrameTime'):
+        return float(frameTime)
+    for key in ('CineRate', 'RecommendedDisplayFrameRate'):
+        if rate := dcm.get(key):
+            return 1000 / float(rate)
+    return config.cineInterval
+
+# 只从文件解码第index帧,不读入其余帧的像素数据
+def getFrameMat(imgDir: str, index: int):
+    return pixel_array(imgDir, index=index)
+
+# 未压缩,小端,单通道8/16位的像素数据,第index帧直接映射为只读numpy.memmap,不能映射时返回None
+# 映射得到的是文件中的原始位模式,BitsStored以外的位与符号由toStored在查表时处理
+def getFrameMap(imgDir: str, index: int):
+    dcm = dcmread(imgDir, defer_size=config.deferSize)
+    elem = dcm.get_item(pixelDataTag, keep_deferred=True)
+    syntax = dcm.file_meta.get('TransferSyntaxUID')
+    if not isinstance(elem, RawDataElement) or not syntax or syntax.is_compressed or syntax.is_deflated \
+            or not syntax.is_little_endian or not numpy.little_endian:
+        return None
+    if dcm.get('SamplesPerPixel', 1) != 1 or dcm.BitsAllocated not in (8, 16):
+        return None
+    dtype = numpy.dtype(f'{"i" if dcm.get("PixelRepresentation") else "u"}{dcm.BitsAllocated // 8}')
+    frameSize = dcm.Rows * dcm.Columns * dtype.itemsize
+    count = getFrameCount(dcm)
+    if elem.length == undefinedLength or elem.length < frameSize * count or not 0 <= index < count:
+        return None
+    return numpy.memmap(imgDir, dtype, 'r', elem.value_tell + index * frameSize, (dcm.Rows, dcm.Columns))
+
+# 用于窗宽窗位的原始像素,config.memoryMap为True时优先映射文件,否则解码
+def getRawFrame(imgDir: str, index: int):
+    if config.memoryMap:
+        try:
+            if (frame := getFrameMap(imgDir, index)) is not None:
+                return frame
+        except (AttributeError, KeyError, TypeError, ValueError):
+            pass
+    return getFrameMat(imgDir, index)
+
+# 只保留低BitsStored位,有符号时按最高位扩展,已解码的像素经过这一步不变
+def toStored(mat: numpy.ndarray, dcm: FileDataset):
+    bits = int(dcm.get('BitsStored') or 8 * mat.dtype.itemsize)
+    if bits >= 8 * mat.dtype.itemsize:
+        return mat
+    values = mat.astype(numpy.int64) & ((1 << bits) - 1)
+    if mat.dtype.kind == 'i':
+        values[values >= 1 << (bits - 1)] -= 1 << bits
+    return values
+
+# 每个像素在x, y方向上的物理尺寸(mm),没有PixelSpacing时返回None
+def getPixelSpacing(dcm: FileDataset):
+    spacing = dcm.get('PixelSpacing')
+    if not spacing or len(spacing) != 2:
+        return None
+    return float(spacing[1]), float(spacing[0])
+
+# dcm文件包含的信息
+def getMdInfo(dcm: FileDataset):
     info = {
         '患者ID': dcm.PatientID, '姓名': dcm.PatientName, '出生日期': toDate(dcm.PatientBirthDate),
         '性别': dcm.PatientSex, '体重': dcm.PatientWeight, '检查开始日期': toDate(dcm.StudyDate),
@@ -52,7 +196,28 @@ def getDcmImgAndMdInfo(imgDir: str):
         else:
             mdInfo += '---\n\n'
         mdInfo += key + ': ' + str(val) + '\n\n'
-    return img, mdInfo
+    return mdInfo
+
+# 病人信息与文件列表用到的标签
+headerTags = [
+    'PatientID', 'PatientName', 'PatientBirthDate', 'PatientSex', 'PatientWeight', 'StudyDate', 'SeriesDate',
+    'PatientAge', 'BodyPartExamined', 'Modality'
+]
+
+# 只解析headerTags,不读取像素数据
+def getDcmHeader(imgDir: str):
+    return dcmread(imgDir, stop_before_pixels=True, specific_tags=headerTags)
+
+# 文件列表显示与搜索的字段,缺少标签时为空
+def getHeaderInfo(dcm: FileDataset):
+    return {key: str(dcm.get(key, '')) for key in ('PatientID', 'PatientName', 'StudyDate', 'Modality')}
+
+# 得到dcm文件(多帧时为第0帧)的qpixmap和包含的信息
+def getDcmImgAndMdInfo(imgDir: str):
+    dcm = dcmread(imgDir, stop_before_pixels=True)
+    mat = getFrameMat(imgDir, 0)
+    img = toQPixmap(toUint8(mat, *getMinMax(mat)))
+    return img, getMdInfo(dcm)
 
 # Windows 10
 # SystemDrive:\HomePath\Pictures\
@@ -174,3 +339,94 @@ def getFootPoint(A: QPointF, B: QPointF, C: QPointF):
 
 def isOnSegment(A: QPointF, B: QPointF, C: QPointF):
     return min(A.x(), B.x()) < C.x() + config.eps and C.x() < max(A.x(), B.x()) + config.eps
+
+# 以下为批量版本,A, B, C为(N, 2)的坐标数组,结果与对应的单点函数一致
+def getMidpoints(A: numpy.ndarray, B: numpy.ndarray):
+    return (A + B) / 2
+
+def getDistances(A: numpy.ndarray, B: numpy.ndarray):
+    return numpy.maximum(numpy.hypot(A[:, 0] - B[:, 0], A[:, 1] - B[:, 1]), config.eps)
+
+# 线段距离相对中点的显示偏移
+def getDistanceShifts(A: numpy.ndarray, B: numpy.ndarray):
+    dx = A[:, 0] - B[:, 0]
+    dy = A[:, 1] - B[:, 1]
+    isVertical = numpy.fabs(dx) < config.eps
+    isHorizontal = ~isVertical & (numpy.fabs(dy) < config.eps)
+    isFalling = ~isVertical & ~isHorizontal & (dx * dy < 0)
+    shifts = numpy.empty_like(A)
+    shifts[:, 0] = numpy.where(isHorizontal, 0, config.distanceShifting)
+    shifts[:, 1] = numpy.select(
+        [isVertical, isHorizontal, isFalling], [0, -config.distanceShifting, config.distanceShifting],
+        -config.distanceShifting
+    )
+    return shifts
+
+def getRadiuses(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    return numpy.minimum(getDistances(B, A), getDistances(B, C)) * config.ratioToRadius
+
+# 角度圆弧的外接矩形,(N, 4): x, y, w, h
+def getArcRects(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    r = getRadiuses(A, B, C)
+    return numpy.column_stack([B[:, 0] - r, B[:, 1] - r, 2 * r, 2 * r])
+
+def getDisPoints(A: numpy.ndarray, B: numpy.ndarray, dis):
+    ratio = dis / getDistances(A, B)
+    return A + (B - A) * ratio[:, None]
+
+def getArcMidpoints(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    return getDisPoints(
+        B, getMidpoints(getDisPoints(B, A, config.base), getDisPoints(B, C, config.base)), getRadiuses(A, B, C)
+    )
+
+def getDots(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    return (A[:, 0] - B[:, 0]) * (C[:, 0] - B[:, 0]) + (A[:, 1] - B[:, 1]) * (C[:, 1] - B[:, 1])
+
+def getCrosses(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    return (A[:, 0] - B[:, 0]) * (C[:, 1] - B[:, 1]) - (C[:, 0] - B[:, 0]) * (A[:, 1] - B[:, 1])
+
+def getDegrees(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    cos = getDots(A, B, C) / getDistances(B, A) / getDistances(B, C)
+    return numpy.degrees(numpy.arccos(numpy.clip(cos, -1, 1)))
+
+def getBeginDegrees(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    D = numpy.where((getCrosses(A, B, C) > 0)[:, None], C, A)
+    E = B.copy()
+    E[:, 0] += config.base
+    deg = getDegrees(D, B, E)
+    return numpy.where(D[:, 1] > B[:, 1], 360 - deg, deg)
+
+# 角度数值相对B的显示偏移,即getDegreeShift(A, B) - B
+def getDegreeShifts(A: numpy.ndarray, B: numpy.ndarray):
+    base = config.degreeShiftingBase
+    more = config.degreeShiftingMore
+    isSameX = numpy.fabs(A[:, 0] - B[:, 0]) < config.eps
+    isSameY = numpy.fabs(A[:, 1] - B[:, 1]) < config.eps
+    isAbove = A[:, 1] > B[:, 1] + config.eps
+    isBelow = A[:, 1] + config.eps < B[:, 1]
+    isRight = A[:, 0] > B[:, 0] + config.eps
+    isLeft = A[:, 0] + config.eps < B[:, 0]
+    # Up, Down, Left, Right, Top Right, Top Left, Bottom Left, Bottom Right
+    conditions = [
+        isAbove & isSameX, isBelow & isSameX, isRight & isSameY, isLeft & isSameY,
+        isLeft & isAbove, isRight & isAbove, isRight & isBelow
+    ]
+    shifts = numpy.empty_like(A)
+    shifts[:, 0] = numpy.select(conditions, [0, 0, -more, base, base, -more, -more], base)
+    shifts[:, 1] = numpy.select(conditions, [-base, base, 0, 0, -base, -base, base], base)
+    return shifts
+
+# 圆的外接矩形,(N, 4): x, y, w, h
+def getMinBoundingRects(A: numpy.ndarray, B: numpy.ndarray):
+    r = getDistances(A, B)
+    return numpy.column_stack([A[:, 0] - r, A[:, 1] - r, 2 * r, 2 * r])
+
+def getFootPoints(A: numpy.ndarray, B: numpy.ndarray, C: numpy.ndarray):
+    a = A[:, 1] - B[:, 1]
+    b = B[:, 0] - A[:, 0]
+    c = -a * A[:, 0] - b * A[:, 1]
+    d = a * a + b * b
+    return numpy.column_stack([
+        (b * b * C[:, 0] - a * b * C[:, 1] - a * c) / d,
+        (a * a * C[:, 1] - a * b * C[:, 0] - b * c) / d
+    ])
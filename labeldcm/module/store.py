@@ -0,0 +1,312 @@
+from labeldcm.module import static
+from labeldcm.module.grid import PointGrid
+from labeldcm.module.link import LinkIndex
+import numpy
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# 按列存放的可增长数组,删除行时用最后一行填补
+class Table(object):
+    __slots__ = ('size', 'columns')
+
+    def __init__(self, **columns: Tuple[tuple, type]):
+        self.size = 0
+        self.columns = {name: numpy.zeros((16,) + shape, dtype) for name, (shape, dtype) in columns.items()}
+
+    def __len__(self):
+        return self.size
+
+    def get(self, name: str):
+        return self.columns[name][:self.size]
+
+    def clear(self):
+        self.size = 0
+
+    def append(self, **values):
+        for name, column in self.columns.items():
+            if self.size == len(column):
+                self.columns[name] = numpy.concatenate([column, numpy.zeros_like(column)])
+            self.columns[name][self.size] = values[name]
+        self.size += 1
+        return self.size - 1
+
+    # 返回被移到row的原最后一行的行号,row本身是最后一行时返回-1
+    def remove(self, row: int):
+        self.size -= 1
+        if row == self.size:
+            return -1
+        for column in self.columns.values():
+            column[row] = column[self.size]
+        return self.size
+
+# 线，角度，圆：key为点标号，ends为点所在行
+class Relation(object):
+    __slots__ = ('table', 'rows', 'keys', 'links', 'normalize')
+
+    def __init__(self, width: int, normalize: Callable[..., Tuple[int, ...]]):
+        self.table = Table(ends=((width,), numpy.int64), color=((), numpy.uint8))
+        self.rows: Dict[Tuple[int, ...], int] = {}
+        self.keys: List[Tuple[int, ...]] = []
+        self.links = LinkIndex()
+        self.normalize = normalize
+
+    def __contains__(self, key: Tuple[int, ...]):
+        return key in self.rows
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.table.clear()
+        self.rows.clear()
+        self.keys.clear()
+        self.links.clear()
+
+    def add(self, key: Tuple[int, ...], ends: List[int], color: int):
+        if key in self.rows:
+            self.table.columns['color'][self.rows[key]] = color
+            return None
+        self.rows[key] = self.table.append(ends=ends, color=color)
+        self.keys.append(key)
+        self.links.add(key)
+
+    def remove(self, key: Tuple[int, ...]):
+        row = self.rows.pop(key)
+        color = int(self.table.columns['color'][row])
+        self.links.remove(key)
+        if self.table.remove(row) != -1:
+            self.keys[row] = self.keys[-1]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        return color
+
+    def getColor(self, key: Tuple[int, ...]):
+        return int(self.table.columns['color'][self.rows[key]])
+
+    # 点从oldRow移到newRow后更新引用
+    def moveEnds(self, label: int, oldRow: int, newRow: int):
+        ends = self.table.columns['ends']
+        for key in self.links.get(label):
+            row = ends[self.rows[key]]
+            row[row == oldRow] = newRow
+
+# 修改记录,frame为最近一条记录所在的帧,-1表示下一条记录前需要先记录帧号
+class Journal(list):
+    def __init__(self):
+        super(Journal, self).__init__()
+        self.frame = -1
+
+# 可以记录和重放的修改
+journalOps = {
+    'clear', 'addPoint', 'movePoint', 'setPointColor', 'removePoint', 'renamePoint',
+    'addLine', 'addAngle', 'addCircle', 'addPivot', 'removePivot'
+}
+
+# 标注数据，点坐标为原图坐标，颜色为config.colorList的下标
+class LabelStore(object):
+    def __init__(self, cellSize: float = 1):
+        self.points = Table(label=((), numpy.int64), xy=((2,), numpy.float64), color=((), numpy.uint8))
+        self.pointRows: Dict[int, int] = {}
+        # AB: IndexA < IndexB
+        self.lines = Relation(2, static.getLineKey)
+        # ∠ABC: IndexA < IndexC
+        self.angles = Relation(3, static.getAngleKey)
+        # ⊙A, r = AB
+        self.circles = Relation(2, lambda indexA, indexB: (indexA, indexB))
+        self.pivots: Set[int] = set()
+        self.grid = PointGrid(cellSize)
+        # 不为空时记录每次修改(方法名, 参数...),用于增量保存
+        self.journal: Optional[Journal] = None
+        # 多帧图片中所在的帧
+        self.frame = 0
+
+    def __contains__(self, index: int):
+        return index in self.pointRows
+
+    def __len__(self):
+        return len(self.pointRows)
+
+    def getRelations(self):
+        return self.lines, self.angles, self.circles
+
+    def record(self, *op):
+        if self.journal is None:
+            return None
+        if self.journal.frame != self.frame:
+            self.journal.frame = self.frame
+            self.journal.append(['selectFrame', self.frame])
+        self.journal.append(list(op))
+
+    # 按记录重新执行修改
+    def replay(self, ops: List[list]):
+        for name, *args in ops:
+            if name not in journalOps:
+                raise ValueError(f'Unknown annotation operation {name}!')
+            getattr(self, name)(*args)
+
+    def clear(self):
+        self.record('clear')
+        self.points.clear()
+        self.pointRows.clear()
+        for relation in self.getRelations():
+            relation.clear()
+        self.pivots.clear()
+        self.grid.clear()
+
+    def getIndexs(self):
+        return self.pointRows.keys()
+
+    def getNewIndex(self):
+        return max(self.pointRows.keys() if self.pointRows else [0]) + 1
+
+    def addPoint(self, index: int, x: float, y: float, color: int):
+        self.record('addPoint', index, x, y, color)
+        self.pointRows[index] = self.points.append(label=index, xy=(x, y), color=color)
+        self.grid.add(index, x, y)
+
+    def getPoint(self, index: int):
+        x, y = self.points.columns['xy'][self.pointRows[index]]
+        return float(x), float(y)
+
+    def movePoint(self, index: int, x: float, y: float):
+        self.record('movePoint', index, x, y)
+        self.points.columns['xy'][self.pointRows[index]] = x, y
+        self.grid.move(index, x, y)
+
+    def getPointColor(self, index: int):
+        return int(self.points.columns['color'][self.pointRows[index]])
+
+    def setPointColor(self, index: int, color: int):
+        self.record('setPointColor', index, color)
+        self.points.columns['color'][self.pointRows[index]] = color
+
+    # 删除点以及引用该点的线，角度，圆
+    def removePoint(self, index: int):
+        if index not in self.pointRows:
+            return None
+        self.record('removePoint', index)
+        for relation in self.getRelations():
+            for key in relation.links.get(index):
+                relation.remove(key)
+        row = self.pointRows.pop(index)
+        if (moved := self.points.remove(row)) != -1:
+            label = int(self.points.columns['label'][row])
+            self.pointRows[label] = row
+            for relation in self.getRelations():
+                relation.moveEnds(label, moved, row)
+        self.grid.remove(index)
+        self.pivots.discard(index)
+
+    # 更改标号，只改动引用该点的线，角度，圆
+    def renamePoint(self, index: int, newIndex: int):
+        self.record('renamePoint', index, newIndex)
+        row = self.pointRows.pop(index)
+        self.pointRows[newIndex] = row
+        self.points.columns['label'][row] = newIndex
+        self.grid.remove(index)
+        self.grid.add(newIndex, *self.getPoint(newIndex))
+        for relation in self.getRelations():
+            for key in relation.links.get(index):
+                color = relation.remove(key)
+                newKey = relation.normalize(*[newIndex if i == index else i for i in key])
+                relation.add(newKey, [self.pointRows[i] for i in newKey], color)
+        if index in self.pivots:
+            self.pivots.remove(index)
+            self.pivots.add(newIndex)
+
+    def addRelation(self, relation: Relation, color: int, *indexs: int):
+        key = relation.normalize(*indexs)
+        relation.add(key, [self.pointRows[i] for i in key], color)
+
+    def addLine(self, indexA: int, indexB: int, color: int):
+        self.record('addLine', indexA, indexB, color)
+        self.addRelation(self.lines, color, indexA, indexB)
+
+    def addAngle(self, indexA: int, indexB: int, indexC: int, color: int):
+        self.record('addAngle', indexA, indexB, indexC, color)
+        self.addRelation(self.angles, color, indexA, indexB, indexC)
+
+    def addCircle(self, indexA: int, indexB: int, color: int):
+        self.record('addCircle', indexA, indexB, color)
+        self.addRelation(self.circles, color, indexA, indexB)
+
+    def addPivot(self, index: int):
+        if index in self.pointRows and index not in self.pivots:
+            self.record('addPivot', index)
+            self.pivots.add(index)
+
+    def removePivot(self, index: int):
+        if index in self.pivots:
+            self.record('removePivot', index)
+            self.pivots.remove(index)
+
+    def hasLine(self, indexA: int, indexB: int):
+        return static.getLineKey(indexA, indexB) in self.lines
+
+    # 半径内最近的点，不存在时返回-1
+    def getNearest(self, x: float, y: float, radius: float):
+        return self.grid.getNearest(x, y, radius)
+
+    # 每条线，角度，圆的端点坐标，形状为(数量, 端点数, 2)，keys不为空时只取这些
+    def getCoords(self, relation: Relation, keys: Optional[List[Tuple[int, ...]]] = None):
+        ends = relation.table.get('ends')
+        if keys is not None:
+            ends = ends[numpy.array([relation.rows[key] for key in keys], numpy.intp)]
+        return self.points.get('xy')[ends]
+
+# 多帧图片每帧一份标注,单帧图片只有第0帧,各帧共享修改记录
+class FrameStores(object):
+    def __init__(self, cellSize: float = 1):
+        self.cellSize = cellSize
+        self.stores: Dict[int, LabelStore] = {}
+        self.frame = 0
+        self.journal: Optional[Journal] = None
+
+    # 按帧号排列的(帧号, 标注)
+    def __iter__(self):
+        return iter(sorted(self.stores.items()))
+
+    def get(self, frame: int):
+        if frame not in self.stores:
+            store = LabelStore(self.cellSize)
+            store.frame = frame
+            store.journal = self.journal
+            self.stores[frame] = store
+        return self.stores[frame]
+
+    def select(self, frame: int):
+        self.frame = frame
+        return self.get(frame)
+
+    def clear(self):
+        self.stores.clear()
+        self.frame = 0
+
+    def setCellSize(self, cellSize: float):
+        self.cellSize = cellSize
+        for store in self.stores.values():
+            store.grid.setCellSize(cellSize)
+
+    def setJournal(self, isRecording: bool):
+        self.journal = Journal() if isRecording else None
+        for store in self.stores.values():
+            store.journal = self.journal
+
+    # 取出并清空修改记录,下一条记录前会重新记录帧号
+    def takeJournal(self):
+        if not self.journal:
+            return []
+        ops = list(self.journal)
+        self.journal.clear()
+        self.journal.frame = -1
+        return ops
+
+    def replay(self, ops: List[list]):
+        store = self.get(self.frame)
+        for op in ops:
+            if op[0] == 'selectFrame':
+                store = self.get(op[1])
+            else:
+                store.replay([op])
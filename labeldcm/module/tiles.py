@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from labeldcm.module.config import config
+from labeldcm.module.profiler import profiler
+from labeldcm.module.series import getImgBytes
+import math
+from PyQt5.QtCore import QPointF, QRect, QRectF, QSize, QSizeF, Qt
+from PyQt5.QtGui import QPainter, QPixmap
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
+from typing import Dict, Optional, Tuple
+
+# 瓦片的LRU缓存,键为(层, 列, 行),总字节数不超过capacity
+class TileCache(object):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.tiles: Dict[Tuple[int, int, int], QPixmap] = OrderedDict()
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def clear(self):
+        self.tiles.clear()
+        self.size = 0
+
+    def get(self, key: Tuple[int, int, int]):
+        if key not in self.tiles:
+            return None
+        self.tiles.move_to_end(key)
+        return self.tiles[key]
+
+    def put(self, key: Tuple[int, int, int], tile: QPixmap):
+        self.tiles[key] = tile
+        self.size += getImgBytes(tile)
+        while self.size > self.capacity and len(self.tiles) > 1:
+            _, tile = self.tiles.popitem(last=False)
+            self.size -= getImgBytes(tile)
+
+# 原图坐标下的分块金字塔,第level层为原图缩小2 ** level倍,每层按config.tileSize分块
+# 绘制时按视图缩放选择不低于屏幕分辨率的层,只绘制与可见区域相交的块,块在首次可见时生成
+# 第0层直接从原图绘制,不生成块
+class TileItem(QGraphicsItem):
+    def __init__(self):
+        super(TileItem, self).__init__()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self.src: Optional[QPixmap] = None
+        # 不为空时代替原图拉伸绘制,用于调整窗宽窗位时的预览
+        self.preview: Optional[QPixmap] = None
+        self.rect = QRectF()
+        self.maxLevel = 0
+        self.cache = TileCache(config.tileCacheCapacity)
+
+    # size为原图尺寸,与src不同时src是全分辨率图片读取完成前的预览,拉伸绘制
+    def setSource(self, src: Optional[QPixmap], size: Optional[QSize] = None):
+        self.prepareGeometryChange()
+        self.src = src
+        self.cache.clear()
+        size = size or (src.size() if src else QSize())
+        self.preview = src if src and src.size() != size else None
+        self.rect = QRectF(QPointF(), QSizeF(size))
+        # 最高层至少还有一个完整的块
+        self.maxLevel = max(int(math.log2(max(size.width(), size.height()) / config.tileSize)), 0) if src else 0
+        self.update()
+
+    def setPreview(self, preview: Optional[QPixmap]):
+        self.preview = preview
+        self.update()
+
+    # lod为屏幕像素 / 原图像素
+    def getLevel(self, lod: float):
+        if lod >= 1:
+            return 0
+        return min(int(math.log2(1 / lod)), self.maxLevel)
+
+    # 块在原图中的范围
+    def getTileRect(self, level: int, i: int, j: int):
+        span = config.tileSize << level
+        return QRect(i * span, j * span, span, span).intersected(self.src.rect())
+
+    def getTile(self, level: int, i: int, j: int):
+        key = (level, i, j)
+        if (tile := self.cache.get(key)) is None:
+            rect = self.getTileRect(level, i, j)
+            size = math.ceil(rect.width() / (1 << level)), math.ceil(rect.height() / (1 << level))
+            tile = self.src.copy(rect).scaled(*size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            self.cache.put(key, tile)
+        return tile
+
+    def boundingRect(self):
+        return self.rect
+
+    @profiler.timed('paintImg')
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
+        if not self.src:
+            return None
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        if self.preview:
+            painter.drawPixmap(self.rect, self.preview, QRectF(self.preview.rect()))
+            return None
+        level = self.getLevel(option.levelOfDetailFromTransform(painter.worldTransform()))
+        exposed = option.exposedRect.intersected(self.rect)
+        span = config.tileSize << level
+        for i in range(int(exposed.left()) // span, math.ceil(exposed.right() / span)):
+            for j in range(int(exposed.top()) // span, math.ceil(exposed.bottom() / span)):
+                rect = self.getTileRect(level, i, j)
+                if level == 0:
+                    painter.drawPixmap(rect, self.src, rect)
+                else:
+                    tile = self.getTile(level, i, j)
+                    painter.drawPixmap(QRectF(rect), tile, QRectF(tile.rect()))
@@ -0,0 +1,113 @@
+from labeldcm.module import static
+import numpy
+from pydicom import FileDataset
+from pydicom.pixels import apply_modality_lut, apply_voi_lut
+from typing import Dict, Optional, Tuple
+
+# 灰度图的窗宽窗位,调整时只重新计算按原始位模式排列的查找表,再查表到复用的8 Bit缓冲区
+class PixelWindow(object):
+    def __init__(self, dcm: FileDataset, raw: numpy.ndarray):
+        self.dtype = raw.dtype
+        self.isInverted = dcm.get('PhotometricInterpretation') == 'MONOCHROME1'
+        patterns = static.getPatterns(raw.dtype)
+        # 原始像素可能是映射的文件内容,BitsStored以外的位与符号在这里处理
+        stored = static.toStored(patterns, dcm)
+        self.isMasked = stored is not patterns
+        # 每个原始位模式的模态值(如CT值),包括RescaleSlope/Intercept与Modality LUT
+        self.values = numpy.asarray(apply_modality_lut(stored, dcm), dtype=numpy.float64)
+        # 文件自带的VOI LUT,未调整窗宽窗位时使用
+        self.voiLut: Optional[numpy.ndarray] = None
+        if 'VOILUTSequence' in dcm:
+            self.voiLut = self.toLut(numpy.asarray(apply_voi_lut(self.values, dcm), dtype=numpy.float64))
+        center, width = self.getDefaultWindow(dcm, raw)
+        self.defaultCenter = self.center = center
+        self.defaultWidth = self.width = width
+        self.lut: Optional[numpy.ndarray] = None
+        self.buffer: Optional[numpy.ndarray] = None
+        # 预览用的采样下标,键为(原图宽高, 预览宽高)
+        self.samples: Dict[tuple, Tuple[numpy.ndarray, numpy.ndarray]] = {}
+        self.previewBuffer: Optional[numpy.ndarray] = None
+
+    # 优先使用WindowCenter/WindowWidth,否则覆盖全部像素值
+    def getDefaultWindow(self, dcm: FileDataset, raw: numpy.ndarray):
+        center = dcm.get('WindowCenter')
+        width = dcm.get('WindowWidth')
+        if center is not None and width is not None:
+            center = center[0] if dcm['WindowCenter'].VM > 1 else center
+            width = width[0] if dcm['WindowWidth'].VM > 1 else width
+            return float(center), max(float(width), 1)
+        low, upp = static.getMinMax(raw)
+        bounds = numpy.array([low, upp], raw.dtype)
+        if self.isMasked and not numpy.array_equal(static.toStored(bounds, dcm), bounds):
+            # 映射的原始像素含有BitsStored以外的位,大小与模态值不一致,统计出现过的位模式
+            bits = raw.view(f'u{raw.dtype.itemsize}').reshape(-1)
+            values = self.values[numpy.flatnonzero(numpy.bincount(bits, minlength=len(self.values)))]
+            low, upp = float(values.min()), float(values.max())
+        else:
+            low, upp = sorted(float(self.values[int(numpy.array(x, raw.dtype).view(f'u{raw.dtype.itemsize}'))])
+                              for x in (low, upp))
+        return (low + upp + 1) / 2, upp - low + 1
+
+    # 值域线性映射到0~255
+    def toLut(self, values: numpy.ndarray):
+        low, upp = values.min(), values.max()
+        return ((values - low) * (255 / max(upp - low, 1))).astype(numpy.uint8)
+
+    def isAdjusted(self):
+        return self.center != self.defaultCenter or self.width != self.defaultWidth
+
+    def setWindow(self, center: float, width: float):
+        self.center = center
+        self.width = max(width, 1)
+        self.lut = None
+
+    def reset(self):
+        self.setWindow(self.defaultCenter, self.defaultWidth)
+
+    # DICOM的线性窗口函数,每个原始位模式的亮度为0~1
+    def getRatio(self):
+        return numpy.clip((self.values - (self.center - 0.5)) / max(self.width - 1, 1) + 0.5, 0, 1)
+
+    # 作用于所有原始位模式
+    def getLut(self):
+        if self.lut is not None:
+            return self.lut
+        if self.voiLut is not None and not self.isAdjusted():
+            lut = self.voiLut
+        else:
+            lut = (self.getRatio() * 255 + 0.5).astype(numpy.uint8)
+        self.lut = 255 - lut if self.isInverted else lut
+        return self.lut
+
+    # 导出16 Bit图片用的查表,不缓存,文件自带的VOI LUT只有8 Bit精度
+    def getLut16(self):
+        if self.voiLut is not None and not self.isAdjusted():
+            ratio = self.voiLut / 255
+        else:
+            ratio = self.getRatio()
+        ratio = 1 - ratio if self.isInverted else ratio
+        return (ratio * 65535 + 0.5).astype(numpy.uint16)
+
+    # 查表得到8 Bit图,返回的缓冲区在下次调用时复用
+    def render(self, raw: numpy.ndarray):
+        if self.buffer is None or self.buffer.shape != raw.shape:
+            self.buffer = numpy.empty(raw.shape, numpy.uint8)
+        return static.applyLut(self.getLut(), raw, self.buffer)
+
+    # 拖动时只按显示尺寸采样查表
+    def renderPreview(self, raw: numpy.ndarray, width: int, height: int):
+        key = (raw.shape, width, height)
+        if key not in self.samples:
+            self.samples.clear()
+            rows = (numpy.arange(height) * raw.shape[0] // height).astype(numpy.intp)
+            cols = (numpy.arange(width) * raw.shape[1] // width).astype(numpy.intp)
+            self.samples[key] = rows, cols
+            self.previewBuffer = numpy.empty((height, width), numpy.uint8)
+        rows, cols = self.samples[key]
+        return static.applyLut(self.getLut(), raw[rows][:, cols], self.previewBuffer)
+
+# 16位以内的单通道整数图才能按窗宽窗位查表
+def getPixelWindow(dcm: FileDataset, raw: numpy.ndarray):
+    if raw.ndim != 2 or not static.isLutDtype(raw.dtype):
+        return None
+    return PixelWindow(dcm, raw)
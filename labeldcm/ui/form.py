@@ -92,6 +92,30 @@ class Ui_Form(object):
         self.imgSizeSlider.setObjectName("imgSizeSlider")
         self.horizontalLayout_3.addWidget(self.imgSizeSlider)
         self.verticalLayout_3.addLayout(self.horizontalLayout_3)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.frameLabel = QtWidgets.QLabel(self.centralwidget)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(3)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.frameLabel.sizePolicy().hasHeightForWidth())
+        self.frameLabel.setSizePolicy(sizePolicy)
+        self.frameLabel.setMinimumSize(QtCore.QSize(77, 0))
+        self.frameLabel.setObjectName("frameLabel")
+        self.horizontalLayout_5.addWidget(self.frameLabel)
+        self.frameSlider = QtWidgets.QSlider(self.centralwidget)
+        self.frameSlider.setEnabled(False)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(7)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.frameSlider.sizePolicy().hasHeightForWidth())
+        self.frameSlider.setSizePolicy(sizePolicy)
+        self.frameSlider.setMinimumSize(QtCore.QSize(172, 0))
+        self.frameSlider.setMaximum(0)
+        self.frameSlider.setOrientation(QtCore.Qt.Horizontal)
+        self.frameSlider.setObjectName("frameSlider")
+        self.horizontalLayout_5.addWidget(self.frameSlider)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_5)
         self.verticalLayout = QtWidgets.QVBoxLayout()
         self.verticalLayout.setObjectName("verticalLayout")
         self.label = QtWidgets.QLabel(self.centralwidget)
@@ -132,6 +156,8 @@ class Ui_Form(object):
         self.menu.setObjectName("menu")
         self.menu_2 = QtWidgets.QMenu(self.menubar)
         self.menu_2.setObjectName("menu_2")
+        self.menu_3 = QtWidgets.QMenu(self.menubar)
+        self.menu_3.setObjectName("menu_3")
         Form.setMenuBar(self.menubar)
         self.statusbar = QtWidgets.QStatusBar(Form)
         self.statusbar.setObjectName("statusbar")
@@ -139,12 +165,43 @@ class Ui_Form(object):
         self.toolBar = QtWidgets.QToolBar(Form)
         self.toolBar.setObjectName("toolBar")
         Form.addToolBar(QtCore.Qt.TopToolBarArea, self.toolBar)
+        self.seriesDock = QtWidgets.QDockWidget(Form)
+        self.seriesDock.setFeatures(QtWidgets.QDockWidget.DockWidgetMovable)
+        self.seriesDock.setObjectName("seriesDock")
+        self.seriesDockContents = QtWidgets.QWidget()
+        self.seriesDockContents.setObjectName("seriesDockContents")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.seriesDockContents)
+        self.verticalLayout_2.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.seriesFilter = QtWidgets.QLineEdit(self.seriesDockContents)
+        self.seriesFilter.setFocusPolicy(QtCore.Qt.ClickFocus)
+        self.seriesFilter.setClearButtonEnabled(True)
+        self.seriesFilter.setObjectName("seriesFilter")
+        self.verticalLayout_2.addWidget(self.seriesFilter)
+        self.seriesList = QtWidgets.QListWidget(self.seriesDockContents)
+        self.seriesList.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.seriesList.setObjectName("seriesList")
+        self.verticalLayout_2.addWidget(self.seriesList)
+        self.seriesDock.setWidget(self.seriesDockContents)
+        Form.addDockWidget(QtCore.Qt.DockWidgetArea(1), self.seriesDock)
         self.loadImgBtn = QtWidgets.QAction(Form)
         self.loadImgBtn.setObjectName("loadImgBtn")
+        self.loadFolderBtn = QtWidgets.QAction(Form)
+        self.loadFolderBtn.setObjectName("loadFolderBtn")
+        self.searchCatalogBtn = QtWidgets.QAction(Form)
+        self.searchCatalogBtn.setObjectName("searchCatalogBtn")
+        self.prevImgBtn = QtWidgets.QAction(Form)
+        self.prevImgBtn.setObjectName("prevImgBtn")
+        self.nextImgBtn = QtWidgets.QAction(Form)
+        self.nextImgBtn.setObjectName("nextImgBtn")
         self.deleteImgBtn = QtWidgets.QAction(Form)
         self.deleteImgBtn.setObjectName("deleteImgBtn")
         self.storeImgBtn = QtWidgets.QAction(Form)
         self.storeImgBtn.setObjectName("storeImgBtn")
+        self.storeLabelBtn = QtWidgets.QAction(Form)
+        self.storeLabelBtn.setObjectName("storeLabelBtn")
+        self.exportSeriesBtn = QtWidgets.QAction(Form)
+        self.exportSeriesBtn.setObjectName("exportSeriesBtn")
         self.quitAppBtn = QtWidgets.QAction(Form)
         self.quitAppBtn.setObjectName("quitAppBtn")
         self.clearAllBtn = QtWidgets.QAction(Form)
@@ -157,9 +214,27 @@ class Ui_Form(object):
         self.originalSizeBtn.setObjectName("originalSizeBtn")
         self.aiBtn = QtWidgets.QAction(Form)
         self.aiBtn.setObjectName("aiBtn")
+        self.resetWindowBtn = QtWidgets.QAction(Form)
+        self.resetWindowBtn.setObjectName("resetWindowBtn")
+        self.prevFrameBtn = QtWidgets.QAction(Form)
+        self.prevFrameBtn.setEnabled(False)
+        self.prevFrameBtn.setObjectName("prevFrameBtn")
+        self.nextFrameBtn = QtWidgets.QAction(Form)
+        self.nextFrameBtn.setEnabled(False)
+        self.nextFrameBtn.setObjectName("nextFrameBtn")
+        self.playFrameBtn = QtWidgets.QAction(Form)
+        self.playFrameBtn.setCheckable(True)
+        self.playFrameBtn.setEnabled(False)
+        self.playFrameBtn.setObjectName("playFrameBtn")
         self.menu.addAction(self.loadImgBtn)
+        self.menu.addAction(self.loadFolderBtn)
+        self.menu.addAction(self.searchCatalogBtn)
+        self.menu.addAction(self.prevImgBtn)
+        self.menu.addAction(self.nextImgBtn)
         self.menu.addAction(self.deleteImgBtn)
         self.menu.addAction(self.storeImgBtn)
+        self.menu.addAction(self.storeLabelBtn)
+        self.menu.addAction(self.exportSeriesBtn)
         self.menu.addSeparator()
         self.menu.addAction(self.quitAppBtn)
         self.menu_2.addAction(self.addSizeBtn)
@@ -167,13 +242,26 @@ class Ui_Form(object):
         self.menu_2.addAction(self.originalSizeBtn)
         self.menu_2.addAction(self.clearAllBtn)
         self.menu_2.addAction(self.aiBtn)
+        self.menu_2.addAction(self.resetWindowBtn)
+        self.menu_3.addAction(self.prevFrameBtn)
+        self.menu_3.addAction(self.playFrameBtn)
+        self.menu_3.addAction(self.nextFrameBtn)
         self.menubar.addAction(self.menu.menuAction())
         self.menubar.addAction(self.menu_2.menuAction())
+        self.menubar.addAction(self.menu_3.menuAction())
         self.toolBar.addAction(self.addSizeBtn)
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.subSizeBtn)
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.originalSizeBtn)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.prevImgBtn)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.nextImgBtn)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.prevFrameBtn)
+        self.toolBar.addAction(self.playFrameBtn)
+        self.toolBar.addAction(self.nextFrameBtn)
 
         self.retranslateUi(Form)
         QtCore.QMetaObject.connectSlotsByName(Form)
@@ -184,17 +272,33 @@ class Ui_Form(object):
         self.label_3.setText(_translate("Form", "颜色"))
         self.label_4.setText(_translate("Form", "操作"))
         self.imgSizeLabel.setText(_translate("Form", "大小：100%"))
+        self.frameLabel.setText(_translate("Form", "帧：1/1"))
         self.label.setText(_translate("Form", "病人信息"))
         self.label_2.setText(_translate("Form", "关键点信息"))
         self.menu.setTitle(_translate("Form", "文件"))
         self.menu_2.setTitle(_translate("Form", "编辑"))
+        self.menu_3.setTitle(_translate("Form", "帧"))
         self.toolBar.setWindowTitle(_translate("Form", "toolBar"))
+        self.seriesDock.setWindowTitle(_translate("Form", "文件列表"))
+        self.seriesFilter.setPlaceholderText(_translate("Form", "搜索文件名/患者ID/姓名/日期"))
         self.loadImgBtn.setText(_translate("Form", "新建"))
         self.loadImgBtn.setShortcut(_translate("Form", "Ctrl+N"))
+        self.loadFolderBtn.setText(_translate("Form", "打开文件夹"))
+        self.loadFolderBtn.setShortcut(_translate("Form", "Ctrl+O"))
+        self.searchCatalogBtn.setText(_translate("Form", "在索引中搜索"))
+        self.searchCatalogBtn.setShortcut(_translate("Form", "Ctrl+F"))
+        self.prevImgBtn.setText(_translate("Form", "上一张"))
+        self.prevImgBtn.setShortcut(_translate("Form", "PgUp"))
+        self.nextImgBtn.setText(_translate("Form", "下一张"))
+        self.nextImgBtn.setShortcut(_translate("Form", "PgDown"))
         self.deleteImgBtn.setText(_translate("Form", "删除"))
         self.deleteImgBtn.setShortcut(_translate("Form", "Ctrl+Z"))
         self.storeImgBtn.setText(_translate("Form", "保存"))
         self.storeImgBtn.setShortcut(_translate("Form", "Ctrl+S"))
+        self.storeLabelBtn.setText(_translate("Form", "保存标注"))
+        self.storeLabelBtn.setShortcut(_translate("Form", "Ctrl+Shift+S"))
+        self.exportSeriesBtn.setText(_translate("Form", "批量导出"))
+        self.exportSeriesBtn.setShortcut(_translate("Form", "Ctrl+E"))
         self.quitAppBtn.setText(_translate("Form", "退出"))
         self.quitAppBtn.setShortcut(_translate("Form", "Ctrl+F4"))
         self.clearAllBtn.setText(_translate("Form", "清除全部"))
@@ -202,3 +306,10 @@ class Ui_Form(object):
         self.subSizeBtn.setText(_translate("Form", "缩小"))
         self.originalSizeBtn.setText(_translate("Form", "还原"))
         self.aiBtn.setText(_translate("Form", "自动判断"))
+        self.resetWindowBtn.setText(_translate("Form", "还原窗宽窗位"))
+        self.prevFrameBtn.setText(_translate("Form", "上一帧"))
+        self.prevFrameBtn.setShortcut(_translate("Form", "Left"))
+        self.nextFrameBtn.setText(_translate("Form", "下一帧"))
+        self.nextFrameBtn.setShortcut(_translate("Form", "Right"))
+        self.playFrameBtn.setText(_translate("Form", "播放"))
+        self.playFrameBtn.setShortcut(_translate("Form", "Space"))
@@ -0,0 +1,40 @@
+from labeldcm.module import static
+from labeldcm.module.item import getAngleStates, getLineStates
+from labeldcm.module.store import LabelStore
+from PyQt5.QtCore import QPointF
+
+# 批量得到的文本锚点(原图坐标)与屏幕像素偏移,与单点函数的绘制位置一致
+
+def getStore(points: dict):
+    store = LabelStore()
+    for index, (x, y) in points.items():
+        store.addPoint(index, x, y, 0)
+    return store
+
+def testLineStates():
+    store = getStore({1: (0, 0), 2: (30, 40), 3: (30, 0), 4: (0, 40), 5: (7, 7)})
+    for key in ((1, 2), (1, 3), (1, 4), (3, 4), (1, 5)):
+        store.addLine(*key, 0)
+    for key, A, B, M, offset, text in getLineStates(store, list(store.lines)):
+        assert M == static.getMidpoint(A, B)
+        assert M + offset == static.getDistanceShift(A, B, M)
+        assert text == str(round(static.getDistance(A, B), 2))
+
+def testAngleStates():
+    store = getStore({1: (1000, 1000), 2: (1500, 1000), 3: (1000, 1500), 4: (500, 500), 5: (1000, 500)})
+    for key in ((2, 1, 3), (3, 1, 2), (4, 1, 2), (5, 1, 4), (2, 1, 4), (4, 5, 2)):
+        store.addAngle(*key, 0)
+    for key, rect, begin, degree, F, offset, text in getAngleStates(store, list(store.angles)):
+        A, B, C = (QPointF(*store.getPoint(index)) for index in key)
+        assert (F - static.getArcMidpoint(A, B, C)).manhattanLength() < 1e-9
+        assert offset == static.getDegreeShift(B, F) - F
+        assert abs(degree - static.getDegree(A, B, C)) < 1e-9
+        assert abs(begin - static.getBeginDegree(A, B, C)) < 1e-9
+
+# 数值位于角的内侧
+def testAngleTextInside():
+    store = getStore({1: (1000, 1000), 2: (1500, 1000), 3: (1000, 1500)})
+    store.addAngle(2, 1, 3, 0)
+    [(_, _, _, _, F, offset, _)] = getAngleStates(store, list(store.angles))
+    assert F.x() > 1000 and F.y() > 1000
+    assert offset.x() > 0 and offset.y() > 0
@@ -0,0 +1,139 @@
+from labeldcm.module import static
+from labeldcm.module.config import config
+import numpy
+import pytest
+from PyQt5.QtCore import QPointF, QRectF
+
+# 批量函数与对应的单点函数逐行比较
+
+def toPoint(xy: numpy.ndarray):
+    return QPointF(float(xy[0]), float(xy[1]))
+
+def toXY(point: QPointF):
+    return [point.x(), point.y()]
+
+def toXYWH(rect: QRectF):
+    return [rect.x(), rect.y(), rect.width(), rect.height()]
+
+# 随机坐标,取值范围小的一组会产生大量同x,同y的点,覆盖各个方向分支
+def getRandomCoords(count: int, span: float, isInteger: bool, seed: int):
+    rng = numpy.random.default_rng(seed)
+    coords = rng.integers(0, span, (count, 3, 2)) if isInteger else rng.uniform(-span, span, (count, 3, 2))
+    return coords.astype(numpy.float64)
+
+# 重合的点,零长度的边,共线与反向共线的角,水平与竖直的边
+def getDegenerateCoords():
+    return numpy.array([
+        [[0, 0], [0, 0], [0, 0]],
+        [[5, 5], [5, 5], [9, 1]],
+        [[9, 1], [5, 5], [5, 5]],
+        [[1, 1], [2, 2], [3, 3]],
+        [[3, 3], [2, 2], [1, 1]],
+        [[1, 1], [3, 3], [2, 2]],
+        [[0, 0], [10, 0], [20, 0]],
+        [[0, 0], [10, 0], [5, 0]],
+        [[0, 0], [0, 10], [0, 20]],
+        [[0, 0], [0, 10], [0, 5]],
+        [[0, 0], [10, 0], [10, 10]],
+        [[10, 10], [10, 0], [0, 0]],
+        [[0, 0], [config.eps / 2, 0], [0, config.eps / 2]],
+        [[1000, 1000], [1500, 1000], [1000, 1500]],
+        [[1500, 1000], [1000, 1000], [1000, 1500]]
+    ], dtype=numpy.float64)
+
+coordCases = {
+    'random': getRandomCoords(500, 2000, False, 0),
+    'grid': getRandomCoords(500, 4, True, 1),
+    'degenerate': getDegenerateCoords()
+}
+
+@pytest.fixture(params=list(coordCases))
+def coords(request):
+    return coordCases[request.param]
+
+def splitCoords(coords: numpy.ndarray):
+    return coords[:, 0], coords[:, 1], coords[:, 2]
+
+def getScalars(func, *arrays: numpy.ndarray):
+    return [func(*(toPoint(array[row]) for array in arrays)) for row in range(len(arrays[0]))]
+
+def testMidpoints(coords):
+    A, B, _ = splitCoords(coords)
+    expected = [toXY(point) for point in getScalars(static.getMidpoint, A, B)]
+    numpy.testing.assert_allclose(static.getMidpoints(A, B), expected, rtol=1e-12, atol=1e-9)
+
+def testDistances(coords):
+    A, B, _ = splitCoords(coords)
+    numpy.testing.assert_allclose(static.getDistances(A, B), getScalars(static.getDistance, A, B), rtol=1e-12)
+
+def testDistanceShifts(coords):
+    A, B, _ = splitCoords(coords)
+    M = static.getMidpoints(A, B)
+    expected = [toXY(point) for point in getScalars(static.getDistanceShift, A, B, M)]
+    numpy.testing.assert_allclose(static.getDistanceShifts(A, B) + M, expected, rtol=1e-12, atol=1e-9)
+
+def testArcRects(coords):
+    A, B, C = splitCoords(coords)
+    numpy.testing.assert_allclose(static.getRadiuses(A, B, C), getScalars(static.getRadius, A, B, C), rtol=1e-12)
+    expected = [toXYWH(QRectF(D, E)) for D, E in getScalars(static.getDiagPoints, A, B, C)]
+    numpy.testing.assert_allclose(static.getArcRects(A, B, C), expected, rtol=1e-12, atol=1e-9)
+
+def testArcMidpoints(coords):
+    A, B, C = splitCoords(coords)
+    expected = [toXY(point) for point in getScalars(static.getArcMidpoint, A, B, C)]
+    numpy.testing.assert_allclose(static.getArcMidpoints(A, B, C), expected, rtol=1e-9, atol=1e-9)
+
+def testDotsAndCrosses(coords):
+    A, B, C = splitCoords(coords)
+    numpy.testing.assert_allclose(static.getDots(A, B, C), getScalars(static.getDot, A, B, C), rtol=1e-12)
+    numpy.testing.assert_allclose(static.getCrosses(A, B, C), getScalars(static.getCross, A, B, C), rtol=1e-12)
+
+# 接近0°或180°时acos对舍入误差很敏感,允许1e-5度的误差
+def testDegrees(coords):
+    A, B, C = splitCoords(coords)
+    numpy.testing.assert_allclose(static.getDegrees(A, B, C), getScalars(static.getDegree, A, B, C), atol=1e-5)
+
+def testBeginDegrees(coords):
+    A, B, C = splitCoords(coords)
+    numpy.testing.assert_allclose(
+        static.getBeginDegrees(A, B, C), getScalars(static.getBeginDegree, A, B, C), atol=1e-5
+    )
+
+# 单点版本返回绝对位置,批量版本返回相对B的偏移
+def testDegreeShifts(coords):
+    A, B, C = splitCoords(coords)
+    F = static.getArcMidpoints(A, B, C)
+    for first, second in ((A, B), (B, F)):
+        expected = [toXY(point) for point in getScalars(static.getDegreeShift, first, second)]
+        numpy.testing.assert_allclose(static.getDegreeShifts(first, second) + second, expected, atol=1e-9)
+
+def testMinBoundingRects(coords):
+    A, B, _ = splitCoords(coords)
+    expected = [toXYWH(rect) for rect in getScalars(static.getMinBoundingRect, A, B)]
+    numpy.testing.assert_allclose(static.getMinBoundingRects(A, B), expected, rtol=1e-12, atol=1e-9)
+
+# 零长度的AB没有垂足:单点版本抛出ZeroDivisionError,批量版本的这一行为nan,不影响其余行
+def testFootPoints(coords):
+    A, B, C = splitCoords(coords)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        feet = static.getFootPoints(A, B, C)
+    for row in range(len(coords)):
+        try:
+            expected = toXY(static.getFootPoint(toPoint(A[row]), toPoint(B[row]), toPoint(C[row])))
+        except ZeroDivisionError:
+            assert numpy.isnan(feet[row]).all()
+            continue
+        numpy.testing.assert_allclose(feet[row], expected, rtol=1e-9, atol=1e-6)
+
+# 切片得到的不连续numpy图也能转换,每行连续且对齐时不复制
+@pytest.mark.parametrize('rows, columns', [
+    (slice(None), slice(None)), (slice(None), slice(0, 16)), (slice(None, None, 2), slice(None)),
+    (slice(None), slice(3, 15)), (slice(None, None, -1), slice(None))
+])
+def testToQImage(rows: slice, columns: slice):
+    mat = numpy.arange(10 * 20, dtype=numpy.uint8).reshape(10, 20)[rows, columns]
+    img = static.toQImage(mat)
+    assert (img.width(), img.height()) == (mat.shape[1], mat.shape[0])
+    assert [[img.pixelColor(x, y).red() for x in range(mat.shape[1])] for y in range(mat.shape[0])] == mat.tolist()
+    if mat.strides[0] > 0 and mat.ctypes.data % 4 == 0:
+        assert img.mat is mat